@@ -29,24 +29,38 @@ COPYRIGHT © 2026 SBS DEUTSCHLAND GMBH. ALL RIGHTS RESERVED.
 import streamlit as st
 from fluid_advisor import FluidSample, FluidAssessment, assess_fluid
 from incident_model import Incident, IncidentPriority
-import tempfile
 import os
 import time
 import logging
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Tuple, Dict, Any, Union, Set
+from typing import Optional, List, Tuple, Dict, Any, Union, Set, FrozenSet, Mapping, Iterator, Callable, TYPE_CHECKING
 from dataclasses import dataclass, field
 from enum import Enum
+import asyncio
+import atexit
 import hashlib
-import re
+import hmac
+import html
+import importlib.util
+import functools
+import secrets
+import itertools
+import pickle
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
 from abc import ABC, abstractmethod
-try:
-    from streamlit_integration import render_video_analyzer_tab
-    VIDEO_AVAILABLE = True
-except:
-    VIDEO_AVAILABLE = False
+# Video analysis pulls in the Gemini SDK; probe for it here and import lazily
+# when the tab is actually rendered.
+VIDEO_AVAILABLE = importlib.util.find_spec("streamlit_integration") is not None
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime (see _get_parser)
+    from llama_parse import LlamaParse
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -62,6 +76,15 @@ class LogLevel(Enum):
     CRITICAL = "CRITICAL"
 
 
+_LEVEL_MAP = {
+    LogLevel.DEBUG: logging.DEBUG,
+    LogLevel.INFO: logging.INFO,
+    LogLevel.WARNING: logging.WARNING,
+    LogLevel.ERROR: logging.ERROR,
+    LogLevel.CRITICAL: logging.CRITICAL,
+}
+
+
 class EnterpriseLogger:
     """
     Structured logging for production environments.
@@ -72,16 +95,23 @@ class EnterpriseLogger:
     - Multi-level logging with proper enum handling
     """
     
+    # Shared by every instance; the stdlib logger registry outlives Streamlit
+    # script reruns, so the handler must only ever be attached once per name
+    _FORMATTER = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s'
+    )
+    _CONFIGURED: Set[str] = set()
+    
     def __init__(self, name: str):
         self.logger = logging.getLogger(name)
-        if not self.logger.handlers:
-            self.logger.setLevel(logging.INFO)
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s'
-            )
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
+        if name in EnterpriseLogger._CONFIGURED or self.logger.handlers:
+            return
+        
+        self.logger.setLevel(logging.INFO)
+        handler = logging.StreamHandler()
+        handler.setFormatter(EnterpriseLogger._FORMATTER)
+        self.logger.addHandler(handler)
+        EnterpriseLogger._CONFIGURED.add(name)
     
     def log(self, level: LogLevel, message: str, **kwargs) -> None:
         """
@@ -93,20 +123,17 @@ class EnterpriseLogger:
             **kwargs: Additional metadata to include as JSON
         """
         try:
-            metadata = json.dumps(kwargs, default=str) if kwargs else ""
-            full_message = f"{message} {metadata}".strip()
-            
-            # Fixed: Using enum value comparison
-            log_methods = {
-                LogLevel.DEBUG: self.logger.debug,
-                LogLevel.INFO: self.logger.info,
-                LogLevel.WARNING: self.logger.warning,
-                LogLevel.ERROR: self.logger.error,
-                LogLevel.CRITICAL: self.logger.critical,
-            }
+            lvl = _LEVEL_MAP.get(level, logging.INFO)
+            # Skip JSON serialization entirely for filtered-out levels
+            if not self.logger.isEnabledFor(lvl):
+                return
             
-            log_method = log_methods.get(level, self.logger.info)
-            log_method(full_message)
+            # stacklevel=2: report the caller's funcName/lineno, not log()'s
+            if kwargs:
+                self.logger.log(lvl, "%s %s", message, json.dumps(kwargs, default=str),
+                                stacklevel=2)
+            else:
+                self.logger.log(lvl, "%s", message, stacklevel=2)
         except Exception as e:
             # Fallback to basic logging if structured logging fails
             self.logger.error(f"Logging error: {e} - Original message: {message}")
@@ -125,46 +152,84 @@ IMPORT_ERROR = None
 RERANKER_AVAILABLE = False
 
 try:
-    from llama_parse import LlamaParse
+    import httpx
+    import nest_asyncio
+    # LlamaParse (and its LlamaCloud client) is imported on first ingest;
+    # sessions that only query never load it
+    if importlib.util.find_spec("llama_parse") is None:
+        raise ImportError("No module named 'llama_parse'")
     from llama_index.core import (
         VectorStoreIndex,
         Document,
         Settings,
-        StorageContext,
     )
     from llama_index.core.node_parser import MarkdownNodeParser
+    from llama_index.core.llms import ChatMessage, MessageRole
+    from llama_index.core.schema import BaseNode, MetadataMode, QueryBundle
     from llama_index.vector_stores.qdrant import QdrantVectorStore
     from llama_index.llms.openai import OpenAI
     from llama_index.embeddings.openai import OpenAIEmbedding
-    from llama_index.core.retrievers import VectorIndexRetriever
+    from llama_index.core.retrievers import VectorIndexRetriever, BaseRetriever
+    from llama_index.core.bridge.pydantic import PrivateAttr
+    from llama_index.core.vector_stores.utils import metadata_dict_to_node
     from qdrant_client import QdrantClient
-    from qdrant_client.models import Distance, VectorParams
+    from qdrant_client.models import (
+        Distance,
+        VectorParams,
+        Filter,
+        FieldCondition,
+        MatchAny,
+        MatchValue,
+        FilterSelector,
+        PayloadSchemaType,
+        HnswConfigDiff,
+        ScalarQuantization,
+        ScalarQuantizationConfig,
+        ScalarType,
+        SearchParams,
+        QuantizationSearchParams,
+        PointStruct,
+    )
     
     IMPORTS_AVAILABLE = True
     logger.log(LogLevel.INFO, "Core dependencies loaded successfully")
     
-    # Optional: BM25 and QueryFusion (may not be installed)
+    # Allow asyncio.run() inside Streamlit / LlamaIndex nested event loops
+    nest_asyncio.apply()
+    
+    # Optional: BM25 and QueryFusion (may not be installed).
+    # From 0.2 the BM25 retriever scores with bm25s (sparse matrices,
+    # vectorized numpy) instead of rank_bm25's per-document Python loop.
     try:
         from llama_index.retrievers.bm25 import BM25Retriever
         from llama_index.core.retrievers import QueryFusionRetriever
         BM25_AVAILABLE = True
+        try:
+            # PyStemmer ships with the bm25s-based retriever (>=0.2)
+            import Stemmer
+        except ImportError:
+            Stemmer = None
         logger.log(LogLevel.INFO, "BM25 Hybrid Retrieval available")
     except ImportError:
         BM25_AVAILABLE = False
+        Stemmer = None
         logger.log(LogLevel.WARNING, "BM25 not available - using vector-only retrieval")
+    
+    # Optional: cross-encoder reranking. Probed rather than imported, since
+    # sentence-transformers pulls in torch; the model loads on first query.
+    if importlib.util.find_spec("sentence_transformers") is not None:
+        from llama_index.core.postprocessor import SentenceTransformerRerank
+        RERANKER_AVAILABLE = True
+        logger.log(LogLevel.INFO, "Cross-encoder reranking available")
         
 except ImportError as e:
     IMPORT_ERROR = str(e)
     BM25_AVAILABLE = False
+    Stemmer = None
     logger.log(LogLevel.CRITICAL, "Critical dependency failure", error=str(e))
 
 # Project Hephaestus (Optional Video Analysis)
-GEMINI_AVAILABLE = False
-try:
-    from streamlit_integration import render_video_analyzer_tab
-    GEMINI_AVAILABLE = True
-    logger.log(LogLevel.INFO, "Project Hephaestus (Video) loaded")
-except ImportError:
+if not VIDEO_AVAILABLE:
     logger.log(LogLevel.WARNING, "Video features disabled - streamlit_integration not found")
 
 
@@ -196,14 +261,65 @@ class SystemConfig:
     TEMPERATURE: float = 0.0
     
     # Advanced RAG
+    # Cross-encoder rerank of the fused candidates (needs sentence-transformers)
     ENABLE_RERANKING: bool = True
+    RERANK_MODEL: str = "BAAI/bge-reranker-v2-m3"
     RERANK_TOP_K: int = 10
-    FUSION_NUM_QUERIES: int = 2
+    # 1 = no LLM-generated sub-queries; NeuralSemanticRouter already expands
+    FUSION_NUM_QUERIES: int = 1
     
     # Performance & Safety
     MAX_RETRIES: int = 3
     TIMEOUT_SECONDS: int = 30
     MAX_CONTEXT_TOKENS: int = 12000
+    RESPONSE_TOKEN_RESERVE: int = 512
+    PASSWORD_HASH_ITERATIONS: int = 600_000
+    
+    # Node parsing: fan out to a process pool above this many pages
+    PARALLEL_PARSE_MIN_DOCS: int = 64
+    # Uploads parsed by LlamaCloud at once (bounded by per-account job limits)
+    PDF_PARSE_CONCURRENCY: int = 4
+    
+    # Vector Store (persistent, incremental upsert)
+    QDRANT_PATH: str = "./qdrant_storage"
+    COLLECTION_NAME: str = "hydraulik_enterprise_v4"
+    EMBED_DIM: int = 1536
+    # OpenAI caps one embedding request at 2048 inputs / 300k tokens;
+    # 128 chunks of up to CHUNK_SIZE tokens stay under both
+    EMBED_BATCH_SIZE: int = 128
+    EMBED_WORKERS: int = 8
+    QDRANT_UPSERT_BATCH_SIZE: int = 128
+    HNSW_M: int = 24
+    HNSW_EF_CONSTRUCT: int = 200
+    HNSW_EF_SEARCH: int = 100
+    # Segments below this many KB of vectors are scanned exactly instead of via
+    # the graph (10000 KB ~ 1600 fp32 vectors of EMBED_DIM)
+    HNSW_FULL_SCAN_THRESHOLD: int = 10000
+    # int8 scalar quantization: vectors in RAM ~4x smaller, fp32 kept on disk for rescoring
+    ENABLE_QUANTIZATION: bool = True
+    # int8 candidates fetched per requested hit before fp32 rescoring
+    QUANTIZATION_OVERSAMPLING: float = 2.0
+    PAYLOAD_INDEX_FIELDS: Tuple[str, ...] = ("source_file", "uploaded_by", "pdf_hash")
+    
+    # Query Embedding Cache
+    EMBED_CACHE_PATH: str = "./embed_cache.pkl"
+    EMBED_CACHE_SIZE: int = 2048
+    
+    # Parsed-PDF cache: LlamaParse output keyed by content hash + parser settings
+    PARSE_CACHE_DIR: str = "./.cache/llamaparse"
+    
+    # Chat history: only the most recent messages are kept and re-rendered
+    CHAT_HISTORY_LIMIT: int = 50
+    
+    # Answer Cache (cleared whenever the index changes)
+    ANSWER_CACHE_SIZE: int = 256
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    
+    # Semantic answer cache: paraphrases of a cached question reuse its answer
+    ENABLE_SEMANTIC_CACHE: bool = True
+    SEMANTIC_CACHE_COLLECTION: str = "query_cache"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_SIZE: int = 1024
 
 
 # Global configuration instance
@@ -230,7 +346,7 @@ class QueryDomain(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(frozen=True)
 class SemanticPattern:
     """
     Weighted semantic pattern for query expansion.
@@ -245,6 +361,59 @@ class SemanticPattern:
     synonyms: List[str]
     context_terms: List[str]
     weight: float = 1.0
+    
+    def __post_init__(self):
+        # Domain classification relies on every matched pattern scoring > 0
+        if self.weight <= 0:
+            raise ValueError(f"SemanticPattern weight must be positive, got {self.weight}")
+
+
+class _NormalizationTable(dict):
+    """
+    ``str.translate`` table mapping every char that is not a word char,
+    whitespace or one of ``-.:/`` to a space.
+    
+    Same semantics as the former regex (word char == ``isalnum()`` or ``_``),
+    filled lazily per code point so the Unicode range is never materialized.
+    """
+    
+    def __missing__(self, codepoint: int) -> str:
+        ch = chr(codepoint)
+        keep = ch.isalnum() or ch.isspace() or ch in "_-.:/"
+        self[codepoint] = ch if keep else " "
+        return self[codepoint]
+
+
+_NORMALIZE_TABLE = _NormalizationTable()
+
+
+def _index_keywords(*ontologies: Mapping[str, SemanticPattern]) -> Dict[str, FrozenSet[str]]:
+    """Map every keyword to the names of the patterns it triggers (names are unique across ontologies)."""
+    index: Dict[str, Set[str]] = {}
+    for ontology in ontologies:
+        for name, pattern in ontology.items():
+            for kw in pattern.keywords:
+                index.setdefault(kw, set()).add(name)
+    return {kw: frozenset(names) for kw, names in index.items()}
+
+
+def _compile_rules(
+    rules: List[Dict[str, Any]]
+) -> Tuple[Tuple[str, FrozenSet[str], Tuple[str, ...], float], ...]:
+    """
+    Freeze cross-domain rules into (mode, condition_terms, add_terms, boost) tuples.
+    
+    Conditions become frozensets so evaluation is a single C-level
+    ``issubset``/``isdisjoint``; an unknown mode fails at import instead of
+    silently never firing. Added terms are pre-sorted and de-duplicated.
+    """
+    compiled = []
+    for rule in rules:
+        mode, terms = next(iter(rule["condition"].items()))
+        if mode not in ("all", "any"):
+            raise ValueError(f"Unknown cross-domain rule mode: {mode!r}")
+        compiled.append((mode, frozenset(terms), tuple(sorted(set(rule["add_terms"]))), rule["boost"]))
+    return tuple(compiled)
 
 
 class NeuralSemanticRouter:
@@ -259,7 +428,7 @@ class NeuralSemanticRouter:
     """
     
     # Hydraulic Domain Ontology
-    HYDRAULIC_ONTOLOGY: Dict[str, SemanticPattern] = {
+    HYDRAULIC_ONTOLOGY: Mapping[str, SemanticPattern] = MappingProxyType({
         "druck": SemanticPattern(
             keywords=["druck", "pressure", "bar", "mpa", "psi"],
             synonyms=["betriebsdruck", "prüfdruck", "berstdruck", "p_max", "pmax", "druckbereich"],
@@ -284,10 +453,10 @@ class NeuralSemanticRouter:
             context_terms=["konfiguration", "ausführung", "variante"],
             weight=1.4
         ),
-    }
+    })
     
     # Appliance Domain Ontology
-    APPLIANCE_ONTOLOGY: Dict[str, SemanticPattern] = {
+    APPLIANCE_ONTOLOGY: Mapping[str, SemanticPattern] = MappingProxyType({
         "temperaturanzeige": SemanticPattern(
             keywords=["temperaturanzeige", "display", "anzeige", "temperatur"],
             synonyms=["anzeigeeinheit", "kerntemperaturanzeige", "temperatur-display",
@@ -321,7 +490,7 @@ class NeuralSemanticRouter:
             context_terms=["diagnose", "fehlersuche", "störungsbeseitigung", "reset", "warnung"],
             weight=1.4
         ),
-    }
+    })
     
     # Cross-Domain Inference Rules
     CROSS_DOMAIN_RULES: List[Dict[str, Any]] = [
@@ -345,82 +514,140 @@ class NeuralSemanticRouter:
         },
     ]
     
+    # Precomputed lookup tables (built once at class load)
+    _KEYWORD_INDEX: Dict[str, FrozenSet[str]] = _index_keywords(
+        HYDRAULIC_ONTOLOGY, APPLIANCE_ONTOLOGY
+    )
+    _PATTERN_EXPANSIONS: Dict[str, Tuple[Tuple[str, ...], float]] = {
+        name: (tuple(sorted(set(pattern.synonyms + pattern.context_terms[:3]))), pattern.weight)
+        for ontology in (HYDRAULIC_ONTOLOGY, APPLIANCE_ONTOLOGY)
+        for name, pattern in ontology.items()
+    }
+    _COMPILED_RULES = _compile_rules(CROSS_DOMAIN_RULES)
+    # Union of every rule condition: if a query touches none of these terms,
+    # no rule can fire (rules only add terms when one fires)
+    _RULE_CONDITION_TERMS: FrozenSet[str] = frozenset().union(
+        *(condition for _, condition, _, _ in _COMPILED_RULES)
+    )
+    _HYDRAULIC_KEYWORDS: FrozenSet[str] = frozenset(_index_keywords(HYDRAULIC_ONTOLOGY))
+    _APPLIANCE_KEYWORDS: FrozenSet[str] = frozenset(_index_keywords(APPLIANCE_ONTOLOGY))
+    # Indexed by (hydraulic_hit << 1) | appliance_hit
+    _DOMAIN_LUT: Tuple[QueryDomain, ...] = (
+        QueryDomain.UNKNOWN, QueryDomain.APPLIANCE, QueryDomain.HYDRAULIC, QueryDomain.HYBRID
+    )
+    # Longest query still treated as a bare type-code / error-code lookup
+    _IDENTIFIER_LOOKUP_MAX_TOKENS = 3
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=2048)
+    def normalize_query(text: str) -> str:
+        """
+        Normalize text for semantic processing.
+        
+        Lowercase, map punctuation to spaces via one ``str.translate``, then
+        collapse whitespace with C-level ``split()``/``join`` (no regex).
+        """
+        return " ".join(text.lower().translate(_NORMALIZE_TABLE).split())
+    
+    @staticmethod
+    def _match_patterns(tokens: Set[str], kw_index: Dict[str, FrozenSet[str]]) -> Set[str]:
+        """Names of all patterns with at least one keyword among the tokens."""
+        matched: Set[str] = set()
+        for kw in tokens & kw_index.keys():
+            matched |= kw_index[kw]
+        return matched
+    
     @classmethod
-    def normalize_query(cls, text: str) -> str:
-        """Normalize text for semantic processing."""
-        t = text.lower().strip()
-        t = re.sub(r"[^\w\s\-.:/äöüß]", " ", t)
-        t = re.sub(r"\s+", " ", t)
-        return t
+    def is_identifier_lookup(cls, query: str) -> bool:
+        """
+        True if the query consists only of a few codes (every token has a digit).
+        
+        Inputs like "A10VSO 71" or "E15" are exact-match lookups: BM25 finds
+        them directly, while their embeddings carry almost no meaning.
+        """
+        tokens = cls.normalize_query(query).split()
+        return (
+            0 < len(tokens) <= cls._IDENTIFIER_LOOKUP_MAX_TOKENS
+            and all(any(ch.isdigit() for ch in token) for token in tokens)
+        )
     
     @classmethod
     def classify_domain(cls, query: str) -> QueryDomain:
         """Classify query into technical domain."""
-        normalized = cls.normalize_query(query)
-        tokens = set(normalized.split())
-        
-        hydraulic_score = sum(
-            pattern.weight
-            for pattern in cls.HYDRAULIC_ONTOLOGY.values()
-            if any(kw in tokens for kw in pattern.keywords)
-        )
-        
-        appliance_score = sum(
-            pattern.weight
-            for pattern in cls.APPLIANCE_ONTOLOGY.values()
-            if any(kw in tokens for kw in pattern.keywords)
-        )
-        
-        if hydraulic_score > 0 and appliance_score > 0:
-            return QueryDomain.HYBRID
-        elif hydraulic_score > appliance_score:
-            return QueryDomain.HYDRAULIC
-        elif appliance_score > hydraulic_score:
-            return QueryDomain.APPLIANCE
-        else:
-            return QueryDomain.UNKNOWN
+        return cls._classify_tokens(set(cls.normalize_query(query).split()))
     
     @classmethod
-    def expand_query(cls, query: str) -> Tuple[str, QueryDomain, float]:
+    def _classify_tokens(cls, tokens: Set[str]) -> QueryDomain:
+        """
+        Classify an already normalized token set.
+        
+        Pattern weights are positive, so a domain's score is > 0 exactly when
+        one of its keywords is present, and the old score comparison reduces
+        to two hit flags: both -> HYBRID, one -> that domain, none -> UNKNOWN.
+        """
+        hydraulic_hit = not cls._HYDRAULIC_KEYWORDS.isdisjoint(tokens)
+        appliance_hit = not cls._APPLIANCE_KEYWORDS.isdisjoint(tokens)
+        return cls._DOMAIN_LUT[(hydraulic_hit << 1) | appliance_hit]
+    
+    @staticmethod
+    def expand_query(query: str) -> Tuple[str, QueryDomain, float]:
         """
         Expand query semantically with domain-aware enrichment.
         
         Returns:
             Tuple of (expanded_query, domain, confidence_score)
         """
-        normalized = cls.normalize_query(query)
-        tokens = set(normalized.split())
+        return NeuralSemanticRouter._expand_normalized(
+            NeuralSemanticRouter.normalize_query(query)
+        )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=2048)
+    def _expand_normalized(normalized: str) -> Tuple[str, QueryDomain, float]:
+        """
+        Expansion proper, memoized on the normalized query.
+        
+        Pure function over static class tables; keying on the normalized
+        form lets case/punctuation variants of a question share one entry.
+        """
+        tokens = normalized.split()
         expansion_terms = set(tokens)
         confidence = 0.0
         
-        domain = cls.classify_domain(query)
+        domain = NeuralSemanticRouter._classify_tokens(expansion_terms)
         
-        # Expand based on domain
-        if domain in [QueryDomain.HYDRAULIC, QueryDomain.HYBRID]:
-            for pattern in cls.HYDRAULIC_ONTOLOGY.values():
-                if any(kw in tokens for kw in pattern.keywords):
-                    expansion_terms.update(pattern.synonyms)
-                    expansion_terms.update(pattern.context_terms[:3])
-                    confidence += pattern.weight
+        # Expand via keyword index. A pattern can only match inside its own
+        # domain's score, so the domain gate is implied by the match itself.
+        matched = NeuralSemanticRouter._match_patterns(
+            expansion_terms, NeuralSemanticRouter._KEYWORD_INDEX
+        )
         
-        if domain in [QueryDomain.APPLIANCE, QueryDomain.HYBRID]:
-            for pattern in cls.APPLIANCE_ONTOLOGY.values():
-                if any(kw in tokens for kw in pattern.keywords):
-                    expansion_terms.update(pattern.synonyms)
-                    expansion_terms.update(pattern.context_terms[:3])
-                    confidence += pattern.weight
+        # Pre-sorted fragments, appended in fixed ontology/rule order; the
+        # final string needs only an ordered de-dup instead of a full sort
+        fragments = [tokens]
+        for name, (terms, weight) in NeuralSemanticRouter._PATTERN_EXPANSIONS.items():
+            if name in matched:
+                expansion_terms.update(terms)
+                fragments.append(terms)
+                confidence += weight
         
         # Apply cross-domain inference rules
-        for rule in cls.CROSS_DOMAIN_RULES:
-            condition = rule["condition"]
-            if "all" in condition and all(term in expansion_terms for term in condition["all"]):
-                expansion_terms.update(rule["add_terms"])
-                confidence += rule["boost"]
-            elif "any" in condition and any(term in expansion_terms for term in condition["any"]):
-                expansion_terms.update(rule["add_terms"])
-                confidence += rule["boost"] * 0.5
-        
-        expanded = " ".join(sorted(expansion_terms))
+        rules = (
+            NeuralSemanticRouter._COMPILED_RULES
+            if not expansion_terms.isdisjoint(NeuralSemanticRouter._RULE_CONDITION_TERMS)
+            else ()
+        )
+        for mode, condition, add_terms, boost in rules:
+            if mode == "all" and condition.issubset(expansion_terms):
+                expansion_terms.update(add_terms)
+                fragments.append(add_terms)
+                confidence += boost
+            elif mode == "any" and not condition.isdisjoint(expansion_terms):
+                expansion_terms.update(add_terms)
+                fragments.append(add_terms)
+                confidence += boost * 0.5
+        
+        expanded = " ".join(dict.fromkeys(itertools.chain.from_iterable(fragments)))
         return expanded, domain, confidence
 
 
@@ -485,6 +712,62 @@ Zitiere JEDE Aussage mit: **"Quelle: <Dateiname> S. <Seite>"**
 4. **Nutze vorhandene Begriffe aus dem Kontext** – auch wenn sie anders formuliert sind!
 """
 
+# Static system message of every RAG chat, assembled at module level. It is
+# sent byte-identical on every call, so OpenAI's automatic prompt caching
+# can reuse it as a cached prefix; everything per-query goes in the user turn.
+_SYSTEM_MESSAGE = f"""
+{ENTERPRISE_SYSTEM_PROMPT}
+
+WICHTIG: Die folgenden Textausschnitte wurden speziell für deine Frage ausgewählt.
+Sie enthalten mit hoher Wahrscheinlichkeit die Antwort oder semantisch verwandte Informationen.
+Analysiere sie GENAU und nutze alle relevanten Begriffe!
+"""
+
+_CONTEXT_HEADER = "KONTEXT AUS DOKUMENTEN:\n"
+
+
+@st.cache_resource(show_spinner=False)
+def _get_token_encoder() -> Optional[Any]:
+    """
+    tiktoken encoding of the LLM, loaded once per process (None if unavailable).
+    
+    Without a cached BPE file tiktoken downloads it; caching the result,
+    including a failed load, keeps that off every later rerun.
+    """
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(config.LLM_MODEL)
+    except Exception:
+        # tiktoken missing, model unknown to it, or BPE file not downloadable
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Exact LLM token count, or ~4 chars per token without tiktoken."""
+    encoder = _get_token_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+@st.cache_resource(show_spinner=False)
+def get_prompt_prefix_tokens() -> int:
+    """
+    Token count of the fixed prompt head, computed once per process.
+    
+    The context assembler packs retrieved chunks into what is left
+    (+8 for the chat format's per-message framing tokens).
+    """
+    return count_tokens(_SYSTEM_MESSAGE) + count_tokens(_CONTEXT_HEADER) + 8
+
+
+def get_context_budget() -> int:
+    """Tokens left for retrieved passages; resolved on the first query, not at import."""
+    return max(
+        config.MAX_CONTEXT_TOKENS - get_prompt_prefix_tokens() - config.RESPONSE_TOKEN_RESERVE,
+        0
+    )
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # AUTHENTICATION & ROLE-BASED ACCESS CONTROL
@@ -502,33 +785,114 @@ class User:
 class AuthManager:
     """Enterprise authentication manager with secure password handling."""
     
+    HASH_SCHEME = "pbkdf2_sha256"
+    
+    # Hash of a random throwaway password; checked for unknown usernames so
+    # they take as long to reject as a wrong password (no user enumeration)
+    _DUMMY_HASH = (
+        "pbkdf2_sha256$600000$2c4151346dec76913259a7ed68948dbc$"
+        "4bcea0bc4f31b11b4eee934b1756ffecf5e331c760231c9d1b6e5f34d54f068d"
+    )
+    
     @staticmethod
-    def get_users() -> Dict[str, Dict[str, str]]:
-        """Retrieve user database from secrets or fallback to defaults."""
+    @st.cache_resource(show_spinner=False)
+    def get_users() -> Mapping[str, Mapping[str, str]]:
+        """
+        Retrieve user database from secrets or fallback to defaults.
+        
+        Cached per process in ``st.cache_resource`` (a plain memo would be
+        lost on every rerun); call ``AuthManager.get_users.clear()`` to
+        pick up changed secrets.
+        """
         try:
             if hasattr(st, 'secrets') and 'users' in st.secrets:
-                return dict(st.secrets['users'])
+                # Deep read-only copy: the cached mapping is shared by all sessions
+                return MappingProxyType({
+                    username: MappingProxyType(dict(user_data))
+                    for username, user_data in st.secrets['users'].items()
+                })
         except Exception as e:
             logger.log(LogLevel.ERROR, "Secrets loading failed", error=str(e))
         
         # Default users for demo/development
-        return {
+        return MappingProxyType({
             "admin": {
                 "name": "Administrator",
-                "password": "0192023a7bbd73250516f069df18b500",  # admin123
+                "password": (  # admin123
+                    "pbkdf2_sha256$600000$8bbfb2a74bdec0ef5348d52adeaf50db$"
+                    "53c4c842741f762588ace4ba81eb48be0a6e6b39bf627972875be5c1130acb9a"
+                ),
                 "role": "admin"
             },
             "demo": {
                 "name": "Demo Benutzer",
-                "password": "62cc2d8b4bf2d8728120d052163a77df",  # demo123
+                "password": (  # demo123
+                    "pbkdf2_sha256$600000$7aeafa5fd03643ce87f28cf4252edbdd$"
+                    "cd4c8c5310d0b74e78410c0021064a8614b96a5f2e54daf7f29fc7112b831d2e"
+                ),
                 "role": "demo"
             }
-        }
+        })
+    
+    @staticmethod
+    def hash_password(
+        password: str,
+        salt: Optional[str] = None,
+        iterations: int = config.PASSWORD_HASH_ITERATIONS
+    ) -> str:
+        """
+        Hash password with salted PBKDF2-SHA256.
+        
+        Deliberately slow: fast digests (MD5, SHA-256, BLAKE2) make offline
+        brute force of a leaked hash cheap, however fast they are to verify.
+        
+        Returns:
+            Encoded hash ``pbkdf2_sha256$<iterations>$<salt_hex>$<hash_hex>``
+        """
+        salt = salt or secrets.token_hex(16)
+        digest = hashlib.pbkdf2_hmac(
+            "sha256", password.encode(), bytes.fromhex(salt), iterations
+        ).hex()
+        return f"{AuthManager.HASH_SCHEME}${iterations}${salt}${digest}"
+    
+    @staticmethod
+    @st.cache_resource(show_spinner=False, max_entries=64)
+    def _decode_hash(stored: str) -> Optional[Tuple[int, bytes, bytes]]:
+        """
+        Split an encoded hash into (iterations, salt, digest) bytes, once per
+        stored hash and process; None if it is not a well-formed PBKDF2 hash.
+        """
+        if not stored.startswith(AuthManager.HASH_SCHEME + "$"):
+            return None
+        try:
+            _, iterations, salt, digest = stored.split("$")
+            return int(iterations), bytes.fromhex(salt), bytes.fromhex(digest)
+        except ValueError:
+            return None
     
     @staticmethod
-    def hash_password(password: str) -> str:
-        """Hash password using MD5 (for demo - use bcrypt in production)."""
-        return hashlib.md5(password.encode()).hexdigest()
+    def verify_password(password: str, stored: str) -> bool:
+        """
+        Constant-time check of a password against its stored hash.
+        
+        Stored hashes are decoded once and compared as raw digest bytes.
+        Legacy unsalted MD5 hex digests from older secrets files are still
+        accepted, but flagged for migration to ``hash_password`` output.
+        """
+        if stored.startswith(AuthManager.HASH_SCHEME + "$"):
+            decoded = AuthManager._decode_hash(stored)
+            if decoded is None:
+                return False
+            iterations, salt, expected = decoded
+            candidate = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+            return hmac.compare_digest(candidate, expected)
+        
+        candidate = hashlib.md5(password.encode()).hexdigest()
+        if hmac.compare_digest(candidate, stored):
+            logger.log(LogLevel.WARNING,
+                       "Legacy MD5 password hash in use; replace it with a pbkdf2_sha256 hash")
+            return True
+        return False
     
     @staticmethod
     def verify_login(username: str, password: str) -> Tuple[bool, Optional[User]]:
@@ -541,7 +905,7 @@ class AuthManager:
         users = AuthManager.get_users()
         if username in users:
             user_data = users[username]
-            if AuthManager.hash_password(password) == user_data['password']:
+            if AuthManager.verify_password(password, user_data['password']):
                 permissions = {"read", "write", "admin"} if user_data['role'] == "admin" else {"read"}
                 user = User(
                     username=username,
@@ -551,6 +915,8 @@ class AuthManager:
                 )
                 logger.log(LogLevel.INFO, "Login successful", username=username)
                 return True, user
+        else:
+            AuthManager.verify_password(password, AuthManager._DUMMY_HASH)
         
         logger.log(LogLevel.WARNING, "Login failed", username=username)
         return False, None
@@ -560,32 +926,39 @@ class AuthManager:
 # SESSION STATE MANAGEMENT
 # ══════════════════════════════════════════════════════════════════════════════
 
+# (key, factory) pairs: mutable defaults are only instantiated for keys
+# that are actually missing from the session
+_SESSION_DEFAULTS: Tuple[Tuple[str, Callable[[], Any]], ...] = (
+    ("authenticated", lambda: False),
+    ("user", lambda: None),
+    ("messages", lambda: deque(maxlen=config.CHAT_HISTORY_LIMIT)),
+    ("index", lambda: None),
+    ("documents_by_file", dict),  # source_file -> parsed pages not yet indexed
+    ("uploaded_files", dict),
+    ("qdrant_client", lambda: None),
+    ("is_ready", lambda: False),
+    ("processing_log", list),
+    ("query_metrics", list),
+    ("index_restore_attempted", lambda: False),
+    ("retriever_cache", dict),
+    ("retriever_owner", lambda: None),
+)
+
+
 def init_session_state() -> None:
     """Initialize application state with safe defaults."""
-    defaults = {
-        "authenticated": False,
-        "user": None,
-        "messages": [],
-        "index": None,
-        "all_documents": [],
-        "uploaded_files": {},
-        "qdrant_client": None,
-        "is_ready": False,
-        "processing_log": [],
-        "query_metrics": [],
-        "nodes_for_bm25": [],  # Store nodes for BM25 retriever
-    }
-    for key, value in defaults.items():
+    for key, factory in _SESSION_DEFAULTS:
         if key not in st.session_state:
-            st.session_state[key] = value
+            st.session_state[key] = factory()
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # API KEY MANAGEMENT
 # ══════════════════════════════════════════════════════════════════════════════
 
+@st.cache_data(ttl=600, show_spinner=False)
 def get_api_keys() -> Tuple[Optional[str], Optional[str]]:
-    """Retrieve API keys from secrets or environment."""
+    """Retrieve API keys from secrets or environment (cached; main() calls this on every rerun)."""
     llama_key, openai_key = None, None
     
     try:
@@ -607,12 +980,14 @@ def get_api_keys() -> Tuple[Optional[str], Optional[str]]:
 # ENTERPRISE UI COMPONENTS
 # ══════════════════════════════════════════════════════════════════════════════
 
-def inject_enterprise_css() -> None:
-    """Inject comprehensive enterprise CSS styling."""
-    st.markdown("""
+# Static page styling, kept as a plain string literal (Streamlit re-executes
+# the script on every rerun, so this costs nothing to re-evaluate). Fonts load
+# via <link> instead of a render-blocking @import inside the stylesheet.
+_ENTERPRISE_CSS = """
+    <link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
     <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-    
     :root {
         --primary-blue: #003366;
         --secondary-blue: #0066B3;
@@ -659,17 +1034,6 @@ def inject_enterprise_css() -> None:
         box-shadow: 0 20px 40px rgba(0, 51, 102, 0.15);
     }
     
-    /* Source Box */
-    .source-box {
-        background: #f0f9ff;
-        border-left: 4px solid var(--secondary-blue);
-        padding: 1rem;
-        margin-top: 0.5rem;
-        border-radius: 0 8px 8px 0;
-        font-size: 0.85rem;
-        color: var(--primary-blue);
-    }
-    
     /* Status Badges */
     .status-badge {
         padding: 4px 12px;
@@ -682,28 +1046,50 @@ def inject_enterprise_css() -> None:
     .status-active { background: #dcfce7; color: #166534; border: 1px solid #86efac; }
     .status-beta { background: #fff7ed; color: #9a3412; border: 1px solid #fdba74; }
     </style>
-    """, unsafe_allow_html=True)
+    """
 
 
-def render_login_page() -> None:
-    """Enterprise login interface."""
-    st.markdown(f"""
-    <div style="max-width: 420px; margin: 3rem auto; padding: 2.5rem;
-        background: rgba(255,255,255,0.95); border-radius: 20px;
-        box-shadow: 0 20px 60px rgba(0,0,0,0.5);">
-        <div style="text-align: center; margin-bottom: 2rem;">
-            <div style="width:80px; height:80px; background:linear-gradient(135deg, #FF8C00 0%, #E67E00 100%);
-                border-radius:20px; display:flex; align-items:center; justify-content:center;
-                font-size:2.5rem; margin:0 auto 1.5rem;">🔧</div>
-            <div style="font-size:1.8rem; font-weight:800; color:#003366; margin-bottom:0.5rem;">
-                {config.APP_NAME}
-            </div>
-            <div style="color:#475569; font-size:0.95rem; font-weight:500;">
-                Enterprise Service Intelligence
-            </div>
+def inject_enterprise_css() -> None:
+    """
+    Inject comprehensive enterprise CSS styling.
+    
+    Must run on every rerun: Streamlit drops elements not re-emitted.
+    """
+    st.markdown(_ENTERPRISE_CSS, unsafe_allow_html=True)
+
+
+# Login chrome depends only on the frozen config, so it is formatted at module
+# level instead of inside the login form (still once per script run: a few
+# string interpolations, not worth a cache)
+_LOGIN_HEADER = f"""
+<div style="max-width: 420px; margin: 3rem auto; padding: 2.5rem;
+    background: rgba(255,255,255,0.95); border-radius: 20px;
+    box-shadow: 0 20px 60px rgba(0,0,0,0.5);">
+    <div style="text-align: center; margin-bottom: 2rem;">
+        <div style="width:80px; height:80px; background:linear-gradient(135deg, #FF8C00 0%, #E67E00 100%);
+            border-radius:20px; display:flex; align-items:center; justify-content:center;
+            font-size:2.5rem; margin:0 auto 1.5rem;">🔧</div>
+        <div style="font-size:1.8rem; font-weight:800; color:#003366; margin-bottom:0.5rem;">
+            {config.APP_NAME}
+        </div>
+        <div style="color:#475569; font-size:0.95rem; font-weight:500;">
+            Enterprise Service Intelligence
         </div>
     </div>
-    """, unsafe_allow_html=True)
+</div>
+"""
+
+_LOGIN_FOOTER = f"""
+<div style="text-align:center; color:#94a3b8; font-size:0.8rem; margin-top:2rem;">
+    © 2026 {config.COMPANY}<br>
+    System Version: {config.VERSION}
+</div>
+"""
+
+
+def render_login_page() -> None:
+    """Enterprise login interface."""
+    st.markdown(_LOGIN_HEADER, unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1, 2, 1])
     
@@ -725,13 +1111,11 @@ def render_login_page() -> None:
         if login_clicked:
             if username and password:
                 with st.spinner("Authenticating..."):
-                    time.sleep(0.5)
                     success, user = AuthManager.verify_login(username, password)
                     if success:
                         st.session_state.authenticated = True
                         st.session_state.user = user
                         st.toast(f"Welcome, {user.name}!", icon="✅")
-                        time.sleep(0.5)
                         st.rerun()
                     else:
                         st.error("❌ Zugangsdaten ungültig")
@@ -746,38 +1130,14 @@ def render_login_page() -> None:
         </div>
         """, unsafe_allow_html=True)
         
-        st.markdown(f"""
-        <div style="text-align:center; color:#94a3b8; font-size:0.8rem; margin-top:2rem;">
-            © 2026 {config.COMPANY}<br>
-            System Version: {config.VERSION}
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_LOGIN_FOOTER, unsafe_allow_html=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # CORE ENGINE: LLAMAPARSE (VISION-ENHANCED PARSING)
 # ══════════════════════════════════════════════════════════════════════════════
 
-def parse_pdf_with_llamaparse(
-    pdf_path: str, 
-    filename: str, 
-    llama_api_key: str
-) -> Optional[List['Document']]:
-    """
-    Enterprise parsing pipeline with vision-enhanced table recognition.
-    
-    Args:
-        pdf_path: Path to PDF file
-        filename: Original filename for metadata
-        llama_api_key: LlamaParse API key
-    
-    Returns:
-        List of Document objects with enriched metadata, or None on failure
-    """
-    try:
-        logger.log(LogLevel.INFO, "Starting LlamaParse", filename=filename)
-        
-        parsing_instruction = """
+_PARSE_INSTRUCTION = """
 Dies ist ein hochtechnisches Datenblatt aus der Hydraulik-/Fluidtechnik-Branche 
 ODER ein komplexes Haushaltsgeräte-Handbuch (Backofen, Waschmaschine, etc.).
 
@@ -811,31 +1171,136 @@ OUTPUT:
 - Markdown mit sauberen Tabellenstrukturen
 - Keine Zusammenfassung – voller Inhalt!
 """
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _get_parser(api_key: str) -> 'LlamaParse':
+    """Process-wide LlamaParse client per API key, reused across uploads (keeps its HTTP session warm)."""
+    from llama_parse import LlamaParse
+    return LlamaParse(
+        api_key=api_key,
+        result_type="markdown",
+        num_workers=8,
+        check_interval=1,
+        verbose=True,
+        language="de",
+        parsing_instruction=_PARSE_INSTRUCTION
+    )
+
+
+# Part of every parse cache key, so changing the instruction or output
+# settings never serves documents parsed under the old ones
+_PARSER_FINGERPRINT = hashlib.sha256(
+    f"llamaparse_v3\nmarkdown\nde\n{_PARSE_INSTRUCTION}".encode()
+).hexdigest()
+
+
+def pdf_content_hash(pdf_bytes: bytes) -> str:
+    """SHA-256 of the raw PDF; stored as ``pdf_hash`` on every indexed node."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _parse_cache_path(pdf_hash: str) -> Path:
+    """Cache file for one PDF's parsed documents (content-addressed)."""
+    key = hashlib.sha256(f"{pdf_hash}\n{_PARSER_FINGERPRINT}".encode()).hexdigest()
+    return Path(config.PARSE_CACHE_DIR) / f"{key}.pkl"
+
+
+def _load_parsed(path: Path) -> Optional[List['Document']]:
+    """Previously parsed documents, or None on a miss or unreadable entry."""
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Parse cache entry unreadable", path=str(path), error=str(e))
+        return None
+
+
+def _store_parsed(path: Path, documents: List['Document']) -> None:
+    """Write parsed documents atomically so concurrent readers never see partial files."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{secrets.token_hex(4)}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(documents, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Parse cache could not be written", error=str(e))
+
+
+# Metadata not embedded with each chunk (source_file and page_number are)
+_EMBED_EXCLUDED_METADATA = (
+    "file_name", "pdf_hash", "processed_at", "uploaded_by", "parser_version", "source_header"
+)
+
+
+async def parse_pdf_with_llamaparse(
+    pdf_bytes: bytes, 
+    filename: str, 
+    llama_api_key: str,
+    pdf_hash: Optional[str] = None
+) -> Optional[List['Document']]:
+    """
+    Enterprise parsing pipeline with vision-enhanced table recognition.
+    
+    Async so several uploads can wait on the LlamaCloud API concurrently.
+    Parsed output is cached on disk by content hash, so re-uploading the
+    same PDF (e.g. after a reset) skips the LlamaCloud round-trip.
+    
+    Args:
+        pdf_bytes: Raw PDF content (uploaded in-memory, no temp file)
+        filename: Original filename for metadata and upload name
+        llama_api_key: LlamaParse API key
+        pdf_hash: Precomputed ``pdf_content_hash(pdf_bytes)``, if available
+    
+    Returns:
+        List of Document objects with enriched metadata, or None on failure
+    """
+    try:
+        pdf_hash = pdf_hash or pdf_content_hash(pdf_bytes)
+        cache_path = _parse_cache_path(pdf_hash)
+        documents = _load_parsed(cache_path)
+        if documents is not None:
+            logger.log(LogLevel.INFO, "Parse cache hit", filename=filename)
+        else:
+            logger.log(LogLevel.INFO, "Starting LlamaParse", filename=filename)
+            parser = _get_parser(llama_api_key)
+            documents = await parser.aload_data(
+                pdf_bytes, extra_info={"file_name": filename}
+            )
+            _store_parsed(cache_path, documents)
         
-        parser = LlamaParse(
-            api_key=llama_api_key,
-            result_type="markdown",
-            num_workers=2,
-            verbose=True,
-            language="de",
-            parsing_instruction=parsing_instruction
+        # Metadata enrichment (per-file values computed once)
+        processed_at = datetime.now().isoformat()
+        uploaded_by = (
+            st.session_state.user.username 
+            if st.session_state.user else "unknown"
         )
-        
-        documents = parser.load_data(pdf_path)
-        
-        # Metadata enrichment
-        for i, doc in enumerate(documents):
-            if not doc.metadata:
-                doc.metadata = {}
-            
-            doc.metadata["page_number"] = i + 1
-            doc.metadata["source_file"] = filename
-            doc.metadata["processed_at"] = datetime.now().isoformat()
-            doc.metadata["uploaded_by"] = (
-                st.session_state.user.username 
-                if st.session_state.user else "unknown"
+        for page_number, doc in enumerate(documents, start=1):
+            metadata = doc.metadata or {}
+            metadata.update(
+                file_name=filename,
+                page_number=page_number,
+                source_file=filename,
+                pdf_hash=pdf_hash,
+                processed_at=processed_at,
+                uploaded_by=uploaded_by,
+                parser_version="llamaparse_v3",
+                # Context header formatted once here; nodes inherit it
+                source_header=f"[Quelle: {filename} S. {page_number}]"
             )
-            doc.metadata["parser_version"] = "llamaparse_v3"
+            doc.metadata = metadata
+            # Bookkeeping fields carry no meaning for retrieval; keeping them out
+            # of the embedded text saves tokens on every chunk of every batch
+            doc.excluded_embed_metadata_keys = [
+                *doc.excluded_embed_metadata_keys, *_EMBED_EXCLUDED_METADATA
+            ]
+            # Presentation only: keep the header out of the LLM's metadata view
+            doc.excluded_llm_metadata_keys = [
+                *doc.excluded_llm_metadata_keys, "source_header"
+            ]
         
         logger.log(LogLevel.INFO, "Parsing successful", 
                    filename=filename, pages=len(documents))
@@ -849,261 +1314,1324 @@ OUTPUT:
 
 
 # ══════════════════════════════════════════════════════════════════════════════
-# VECTOR STORE & INDEX CREATION
+# QUERY EMBEDDING CACHE
 # ══════════════════════════════════════════════════════════════════════════════
 
-def create_or_update_index(
-    documents: List['Document'], 
-    openai_api_key: str
-) -> Optional['VectorStoreIndex']:
+class QueryEmbeddingCache:
     """
-    Build semantic vector index with Qdrant + OpenAI embeddings.
+    Thread-safe LRU cache of query embeddings, persisted to disk on shutdown.
     
-    Args:
-        documents: Parsed documents with metadata
-        openai_api_key: OpenAI API key
-    
-    Returns:
-        VectorStoreIndex or None on failure
+    Keys are SHA-256 digests of (model, query text), so repeated questions
+    cost zero embedding API calls.
     """
-    try:
-        logger.log(LogLevel.INFO, "Initializing vector index", 
-                   doc_count=len(documents))
-        
-        # Configure LLM & Embeddings
-        llm = OpenAI(
-            model=config.LLM_MODEL,
-            api_key=openai_api_key,
-            temperature=config.TEMPERATURE
-        )
-        
-        embed_model = OpenAIEmbedding(
-            model=config.EMBED_MODEL,
-            api_key=openai_api_key
-        )
+    
+    def __init__(self, path: str, maxsize: int):
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, List[float]]" = OrderedDict()
         
-        # Apply global settings
-        Settings.llm = llm
-        Settings.embed_model = embed_model
-        Settings.chunk_size = config.CHUNK_SIZE
-        Settings.chunk_overlap = config.CHUNK_OVERLAP
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    self._data.update(pickle.load(f))
+                logger.log(LogLevel.INFO, "Embedding cache loaded", entries=len(self._data))
+            except Exception as e:
+                logger.log(LogLevel.WARNING, "Embedding cache unreadable, starting empty", error=str(e))
+    
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._data.get(key)
+            if embedding is not None:
+                self._data.move_to_end(key)
+            return embedding
+    
+    def put(self, key: str, embedding: List[float]) -> None:
+        with self._lock:
+            self._data[key] = embedding
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def save(self) -> None:
+        with self._lock:
+            snapshot = OrderedDict(self._data)
+        try:
+            with open(self.path, "wb") as f:
+                pickle.dump(snapshot, f)
+        except Exception as e:
+            logger.log(LogLevel.WARNING, "Embedding cache could not be saved", error=str(e))
+
+
+@st.cache_resource
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Process-wide query embedding cache, saved when the server exits."""
+    cache = QueryEmbeddingCache(config.EMBED_CACHE_PATH, config.EMBED_CACHE_SIZE)
+    atexit.register(cache.save)
+    return cache
+
+
+if IMPORTS_AVAILABLE:
+    class CachedOpenAIEmbedding(OpenAIEmbedding):
+        """OpenAIEmbedding that serves repeated query embeddings from QueryEmbeddingCache."""
         
-        # Initialize Qdrant in-memory
-        if st.session_state.qdrant_client is None:
-            st.session_state.qdrant_client = QdrantClient(":memory:")
-            logger.log(LogLevel.INFO, "Created Qdrant in-memory instance")
+        _query_cache: QueryEmbeddingCache = PrivateAttr()
         
-        client = st.session_state.qdrant_client
-        collection_name = "hydraulik_enterprise_v4"
+        def __init__(self, query_cache: QueryEmbeddingCache, **kwargs: Any):
+            super().__init__(**kwargs)
+            self._query_cache = query_cache
         
-        # Clean slate strategy
-        collections = client.get_collections().collections
-        if any(c.name == collection_name for c in collections):
-            client.delete_collection(collection_name)
+        def _get_query_embedding(self, query: str) -> List[float]:
+            key = QueryEmbeddingCache.make_key(self.model_name, query)
+            embedding = self._query_cache.get(key)
+            if embedding is None:
+                embedding = super()._get_query_embedding(query)
+                self._query_cache.put(key, embedding)
+            return embedding
         
-        client.create_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(size=1536, distance=Distance.COSINE)
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            key = QueryEmbeddingCache.make_key(self.model_name, query)
+            embedding = self._query_cache.get(key)
+            if embedding is None:
+                embedding = await super()._aget_query_embedding(query)
+                self._query_cache.put(key, embedding)
+            return embedding
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ANSWER CACHE
+# ══════════════════════════════════════════════════════════════════════════════
+
+class AnswerCache:
+    """
+    Thread-safe LRU of finished answers with per-entry TTL.
+    
+    Keyed on (normalized question, scope, model, temperature). The cache
+    is process-wide like the Qdrant collection it answers from; when the
+    collection changes, the entries that change can affect are dropped
+    instead of tracking index versions.
+    """
+    
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple, Tuple[float, str, List[str]]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(question: str, source_file: Optional[str]) -> Tuple:
+        return (
+            NeuralSemanticRouter.normalize_query(question),
+            source_file or "",
+            config.LLM_MODEL,
+            config.TEMPERATURE
         )
-        
-        # Create vector store
-        vector_store = QdrantVectorStore(
-            client=client,
-            collection_name=collection_name
+    
+    def get(self, key: Tuple) -> Optional[Tuple[str, List[str]]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, answer, sources = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return answer, sources
+    
+    def put(self, key: Tuple, answer: str, sources: List[str]) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), answer, list(sources))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self, source_files: Optional[Set[str]] = None) -> None:
+        """
+        Drop all entries, or only those a change to ``source_files`` can
+        affect: answers scoped to one of them and all-documents answers.
+        """
+        with self._lock:
+            if source_files is None:
+                self._data.clear()
+                return
+            affected = source_files | {""}
+            for key in [k for k in self._data if k[1] in affected]:
+                del self._data[key]
+
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache."""
+    return AnswerCache(config.ANSWER_CACHE_SIZE, config.ANSWER_CACHE_TTL_SECONDS)
+
+
+class SemanticAnswerCache:
+    """
+    Answers looked up by question embedding in a side Qdrant collection.
+    
+    Catches paraphrases the exact-match AnswerCache misses. Hits must
+    share the AnswerCache key's scope (document, model, temperature) plus
+    every digit-bearing token of the question, and reach the cosine
+    threshold. Like AnswerCache, the collection is dropped whenever the
+    document collection changes.
+    """
+    
+    def __init__(self, collection_name: str, threshold: float, ttl_seconds: int, maxsize: int):
+        self.collection_name = collection_name
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+    
+    @staticmethod
+    def _scope(cache_key: Tuple) -> str:
+        # "A10VSO 140" and "A10VSO 28" embed almost identically but need
+        # different answers, so type codes and figures must match exactly
+        identifiers = sorted({
+            token for token in cache_key[0].split()
+            if any(ch.isdigit() for ch in token)
+        })
+        return "|".join(str(part) for part in (*cache_key[1:], " ".join(identifiers)))
+    
+    def get(self, embedding: List[float], cache_key: Tuple) -> Optional[Tuple[str, List[str]]]:
+        client = get_qdrant_client()
+        if not client.collection_exists(self.collection_name):
+            return None
+        hits = client.query_points(
+            collection_name=self.collection_name,
+            query=embedding,
+            query_filter=Filter(must=[
+                FieldCondition(key="scope", match=MatchValue(value=self._scope(cache_key)))
+            ]),
+            limit=1,
+            score_threshold=self.threshold,
+            with_payload=True
+        ).points
+        if not hits:
+            return None
+        payload = hits[0].payload or {}
+        # Wall clock, since entries outlive the process
+        if time.time() - payload.get("stored_at", 0) > self.ttl_seconds:
+            return None
+        return payload["answer"], payload["sources"]
+    
+    def put(self, embedding: List[float], cache_key: Tuple, answer: str, sources: List[str]) -> None:
+        client = get_qdrant_client()
+        if not client.collection_exists(self.collection_name):
+            client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(size=config.EMBED_DIM, distance=Distance.COSINE)
+            )
+            client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="scope",
+                field_schema=PayloadSchemaType.KEYWORD
+            )
+        elif client.count(self.collection_name).count >= self.maxsize:
+            return  # full until the next collection change clears it
+        
+        # Deterministic ID: asking the same question again overwrites its entry
+        point_id = str(uuid.UUID(hashlib.md5(repr(cache_key).encode()).hexdigest()))
+        client.upsert(
+            collection_name=self.collection_name,
+            points=[PointStruct(
+                id=point_id,
+                vector=embedding,
+                payload={
+                    "scope": self._scope(cache_key),
+                    "source_file": cache_key[1],
+                    "answer": answer,
+                    "sources": list(sources),
+                    "stored_at": time.time()
+                }
+            )]
+        )
+    
+    def clear(self, source_files: Optional[Set[str]] = None) -> None:
+        """Same contract as ``AnswerCache.clear``."""
+        client = get_qdrant_client()
+        if not client.collection_exists(self.collection_name):
+            return
+        if source_files is None:
+            client.delete_collection(self.collection_name)
+            return
+        client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(
+                filter=Filter(must=[
+                    FieldCondition(key="source_file", match=MatchAny(any=[*source_files, ""]))
+                ])
+            )
+        )
+
+
+@st.cache_resource
+def get_semantic_cache() -> SemanticAnswerCache:
+    """Process-wide semantic answer cache."""
+    return SemanticAnswerCache(
+        config.SEMANTIC_CACHE_COLLECTION,
+        config.SEMANTIC_CACHE_THRESHOLD,
+        config.ANSWER_CACHE_TTL_SECONDS,
+        config.SEMANTIC_CACHE_SIZE
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# VECTOR STORE & INDEX CREATION
+# ══════════════════════════════════════════════════════════════════════════════
+
+@st.cache_resource
+def get_qdrant_client() -> 'QdrantClient':
+    """
+    Process-wide persistent Qdrant client.
+    
+    Connects to a Qdrant server when QDRANT_URL is set. Only the server
+    builds the HNSW graph and int8-quantized vectors configured on the
+    collection; embedded local mode ignores both and does an exact scan.
+    Local on-disk storage may only be opened by one client per process,
+    so the instance is shared across all Streamlit sessions.
+    """
+    qdrant_url = os.getenv("QDRANT_URL")
+    if qdrant_url:
+        logger.log(LogLevel.INFO, "Connecting to Qdrant server", url=qdrant_url)
+        return QdrantClient(url=qdrant_url, api_key=os.getenv("QDRANT_API_KEY"))
+    
+    qdrant_path = os.getenv("QDRANT_PATH", config.QDRANT_PATH)
+    logger.log(LogLevel.INFO, "Opening persistent Qdrant storage", path=qdrant_path)
+    return QdrantClient(path=qdrant_path)
+
+
+def compute_doc_id(doc: 'Document') -> str:
+    """Content-addressed document ID: SHA-256 of (source_file, page_number, text)."""
+    # Unit-separated: plain concatenation let page 1 + "2 ..." collide with page 12 + " ..."
+    key = "\x1f".join((
+        str(doc.metadata.get('source_file', '')),
+        str(doc.metadata.get('page_number', '')),
+        doc.text
+    ))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_indexed_doc_ids(
+    client: 'QdrantClient',
+    collection_name: str,
+    source_files: Set[str]
+) -> Set[str]:
+    """Collect the document IDs already indexed for the given files (payload only, no vectors)."""
+    doc_ids: Set[str] = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=Filter(must=[
+                FieldCondition(key="source_file", match=MatchAny(any=list(source_files)))
+            ]),
+            limit=256,
+            offset=offset,
+            with_payload=["doc_id"],
+            with_vectors=False
+        )
+        doc_ids.update(p.payload["doc_id"] for p in points if p.payload and "doc_id" in p.payload)
+        if offset is None:
+            return doc_ids
+
+
+def load_persisted_nodes(client: 'QdrantClient', collection_name: str) -> List['BaseNode']:
+    """Rebuild text nodes from the stored Qdrant payloads (no vectors, no re-parsing)."""
+    nodes: List['BaseNode'] = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=256,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        nodes.extend(metadata_dict_to_node(p.payload) for p in points if p.payload)
+        if offset is None:
+            return nodes
+
+
+def get_indexed_page_counts(client: 'QdrantClient', collection_name: str) -> Dict[str, int]:
+    """Count distinct pages per source file from two payload fields (no node texts)."""
+    pages_by_file: Dict[str, Set[Any]] = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=256,
+            offset=offset,
+            with_payload=["source_file", "page_number"],
+            with_vectors=False
+        )
+        for p in points:
+            payload = p.payload or {}
+            pages_by_file.setdefault(
+                payload.get("source_file", "Unbekannt"), set()
+            ).add(payload.get("page_number"))
+        if offset is None:
+            return {name: len(pages) for name, pages in pages_by_file.items()}
+
+
+@st.cache_data(show_spinner=False)
+def get_collection_page_counts() -> Dict[str, int]:
+    """
+    Page counts of the persistent collection, scrolled once per process.
+    
+    Every new session restores from these; the cache is cleared whenever
+    the collection changes.
+    """
+    client = get_qdrant_client()
+    if not client.collection_exists(config.COLLECTION_NAME):
+        return {}
+    return get_indexed_page_counts(client, config.COLLECTION_NAME)
+
+
+def find_indexed_pdf(client: 'QdrantClient', collection_name: str, pdf_hash: str) -> Optional[str]:
+    """Source file under which identical PDF content is already indexed, if any."""
+    if not client.collection_exists(collection_name):
+        return None
+    points, _ = client.scroll(
+        collection_name=collection_name,
+        scroll_filter=Filter(must=[
+            FieldCondition(key="pdf_hash", match=MatchValue(value=pdf_hash))
+        ]),
+        limit=1,
+        with_payload=["source_file"],
+        with_vectors=False
+    )
+    return (points[0].payload or {}).get("source_file") if points else None
+
+
+def get_indexed_node_count() -> int:
+    """Number of nodes in the persistent collection (0 if it does not exist yet)."""
+    try:
+        client = get_qdrant_client()
+        if not client.collection_exists(config.COLLECTION_NAME):
+            return 0
+        return client.count(config.COLLECTION_NAME, exact=True).count
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Node count failed", error=str(e))
+        return 0
+
+
+def delete_source_file(client: 'QdrantClient', collection_name: str, filename: str) -> None:
+    """Delete every vector of one uploaded file via the source_file payload index."""
+    if not client.collection_exists(collection_name):
+        return
+    client.delete(
+        collection_name=collection_name,
+        points_selector=FilterSelector(
+            filter=Filter(must=[
+                FieldCondition(key="source_file", match=MatchValue(value=filename))
+            ])
+        )
+    )
+
+
+def _parse_markdown_batch(documents: List['Document']) -> List['BaseNode']:
+    """Process-pool worker: split one batch of documents into Markdown nodes."""
+    return MarkdownNodeParser().get_nodes_from_documents(documents)
+
+
+@st.cache_resource
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Process-wide worker pool for node parsing; workers are spawned once, not per ingest."""
+    pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+
+def parse_nodes(documents: List['Document']) -> List['BaseNode']:
+    """
+    Split documents into Markdown nodes.
+    
+    Markdown parsing is CPU-bound and GIL-limited, so large ingests are
+    split into one batch per core and parsed in a process pool.
+    """
+    workers = os.cpu_count() or 1
+    if len(documents) < config.PARALLEL_PARSE_MIN_DOCS or workers < 2:
+        return _parse_markdown_batch(documents)
+    
+    batch_size = -(-len(documents) // workers)
+    batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+    try:
+        pool = get_parse_pool()
+        return list(itertools.chain.from_iterable(pool.map(_parse_markdown_batch, batches)))
+    except Exception as e:
+        # A crashed worker breaks the pool; start a fresh one next time
+        get_parse_pool.clear()
+        logger.log(LogLevel.WARNING, "Parallel node parsing failed, parsing serially", error=str(e))
+        return _parse_markdown_batch(documents)
+
+
+@st.cache_resource
+def get_http_client() -> 'httpx.Client':
+    """
+    Process-wide HTTP client shared by the OpenAI LLM and embedding clients.
+    
+    HTTP/2 multiplexes concurrent streams and embedding batches over one
+    TLS connection; falls back to pooled HTTP/1.1 if ``h2`` is missing.
+    Async calls keep the SDK's own client, since an httpx.AsyncClient is
+    bound to the event loop and each query runs in a fresh one.
+    """
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    try:
+        return httpx.Client(http2=True, limits=limits)
+    except ImportError:
+        logger.log(LogLevel.WARNING, "h2 not installed, using HTTP/1.1 connection pool")
+        return httpx.Client(limits=limits)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _get_llm(model: str, temperature: float, api_key: str) -> 'OpenAI':
+    """Process-wide LLM client per model/temperature/key, reused across reruns and sessions."""
+    return OpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=api_key,
+        http_client=get_http_client()
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _get_embed_model(model: str, api_key: str) -> 'CachedOpenAIEmbedding':
+    """Process-wide embedding client per model/key, shared like the LLM."""
+    return CachedOpenAIEmbedding(
+        query_cache=get_query_embedding_cache(),
+        model=model,
+        api_key=api_key,
+        embed_batch_size=config.EMBED_BATCH_SIZE,
+        num_workers=config.EMBED_WORKERS,
+        http_client=get_http_client()
+    )
+
+
+def _scalar_quantization() -> Optional['ScalarQuantization']:
+    """int8 quantization config for the collection, or None when disabled."""
+    if not config.ENABLE_QUANTIZATION:
+        return None
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8,
+            quantile=0.99,
+            always_ram=True
         )
+    )
+
+
+def ensure_collection(client: 'QdrantClient', collection_name: str) -> None:
+    """
+    Create the HNSW collection on first run, or bring an existing one in
+    line with the configured HNSW and quantization parameters.
+    
+    Search cost is O(log N) graph hops instead of a linear scan; when
+    HNSW_M / HNSW_EF_CONSTRUCT change, the server rebuilds the graph in
+    the background rather than the app re-embedding anything.
+    """
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(
+                size=config.EMBED_DIM,
+                distance=Distance.COSINE,
+                # With the int8 copy in RAM, fp32 originals are only read to rescore
+                on_disk=config.ENABLE_QUANTIZATION
+            ),
+            on_disk_payload=True,
+            hnsw_config=HnswConfigDiff(
+                m=config.HNSW_M,
+                ef_construct=config.HNSW_EF_CONSTRUCT,
+                full_scan_threshold=config.HNSW_FULL_SCAN_THRESHOLD
+            ),
+            quantization_config=_scalar_quantization()
+        )
+        # Keyword indexes let filtered search use the inverted index
+        # instead of scanning every segment's payload
+        for field_name in config.PAYLOAD_INDEX_FIELDS:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD
+            )
+        logger.log(LogLevel.INFO, "Created Qdrant collection", collection=collection_name)
+        return
+    
+    if not os.getenv("QDRANT_URL"):
+        return  # embedded mode keeps no HNSW graph to tune
+    
+    try:
+        collection_config = client.get_collection(collection_name).config
+        if config.ENABLE_QUANTIZATION and collection_config.quantization_config is None:
+            client.update_collection(
+                collection_name=collection_name,
+                quantization_config=_scalar_quantization()
+            )
+            logger.log(LogLevel.INFO, "Enabled int8 quantization", collection=collection_name)
+        hnsw = collection_config.hnsw_config
+        wanted = (config.HNSW_M, config.HNSW_EF_CONSTRUCT, config.HNSW_FULL_SCAN_THRESHOLD)
+        if (hnsw.m, hnsw.ef_construct, hnsw.full_scan_threshold) != wanted:
+            client.update_collection(
+                collection_name=collection_name,
+                hnsw_config=HnswConfigDiff(
+                    m=config.HNSW_M,
+                    ef_construct=config.HNSW_EF_CONSTRUCT,
+                    full_scan_threshold=config.HNSW_FULL_SCAN_THRESHOLD
+                )
+            )
+            logger.log(LogLevel.INFO, "Updated HNSW config",
+                       m=config.HNSW_M, ef_construct=config.HNSW_EF_CONSTRUCT,
+                       full_scan_threshold=config.HNSW_FULL_SCAN_THRESHOLD)
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Collection config check failed", error=str(e))
+
+
+def configure_settings(openai_api_key: str) -> None:
+    """
+    Point the global LlamaIndex settings at the cached LLM and embedding clients.
+    
+    ``Settings`` is shared by every session in the process, so these are
+    only fallbacks for LlamaIndex internals; indexing and queries pass the
+    session's own clients explicitly.
+    """
+    Settings.llm = _get_llm(config.LLM_MODEL, config.TEMPERATURE, openai_api_key)
+    Settings.embed_model = _get_embed_model(config.EMBED_MODEL, openai_api_key)
+    Settings.chunk_size = config.CHUNK_SIZE
+    Settings.chunk_overlap = config.CHUNK_OVERLAP
+
+
+def create_or_update_index(
+    documents: List['Document'], 
+    openai_api_key: str
+) -> Optional['VectorStoreIndex']:
+    """
+    Sync the persistent Qdrant collection with the given documents.
+    
+    Only documents not yet in the collection are embedded and inserted;
+    outdated pages of the same files are deleted. Re-uploading unchanged
+    content therefore costs no embedding calls, and files indexed in
+    earlier sessions are left untouched.
+    
+    Args:
+        documents: Parsed documents with metadata
+        openai_api_key: OpenAI API key
+    
+    Returns:
+        VectorStoreIndex or None on failure
+    """
+    try:
+        logger.log(LogLevel.INFO, "Initializing vector index", 
+                   doc_count=len(documents))
         
-        node_parser = MarkdownNodeParser()
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        # Configure LLM & Embeddings
+        configure_settings(openai_api_key)
         
-        # Build index
-        index = VectorStoreIndex.from_documents(
-            documents,
-            storage_context=storage_context,
-            node_parser=node_parser,
-            show_progress=True
-        )
+        # Persistent Qdrant (shared per process)
+        if st.session_state.qdrant_client is None:
+            st.session_state.qdrant_client = get_qdrant_client()
         
-        # Store nodes for BM25 (if available)
-        try:
-            nodes = node_parser.get_nodes_from_documents(documents)
-            st.session_state.nodes_for_bm25 = nodes
-            logger.log(LogLevel.INFO, "Nodes stored for BM25", node_count=len(nodes))
-        except Exception as e:
-            logger.log(LogLevel.WARNING, "Could not store nodes for BM25", error=str(e))
-            st.session_state.nodes_for_bm25 = []
+        client = st.session_state.qdrant_client
+        collection_name = config.COLLECTION_NAME
+        
+        ensure_collection(client, collection_name)
+        
+        # Content-addressed IDs make re-ingest of unchanged pages a no-op
+        for doc in documents:
+            doc.doc_id = compute_doc_id(doc)
+        
+        source_files = {doc.metadata.get("source_file") for doc in documents}
+        wanted_ids = {doc.doc_id for doc in documents}
+        indexed_ids = get_indexed_doc_ids(client, collection_name, source_files)
+        new_documents = [doc for doc in documents if doc.doc_id not in indexed_ids]
+        stale_ids = indexed_ids - wanted_ids
+        
+        if stale_ids:
+            client.delete(
+                collection_name=collection_name,
+                points_selector=FilterSelector(
+                    filter=Filter(must=[
+                        FieldCondition(key="doc_id", match=MatchAny(any=list(stale_ids)))
+                    ])
+                )
+            )
+        
+        # Create vector store (points are upserted in batches, not one call per node)
+        vector_store = QdrantVectorStore(
+            client=client,
+            collection_name=collection_name,
+            batch_size=config.QDRANT_UPSERT_BATCH_SIZE
+        )
         
+        # Session's own client: Settings is process-global and may hold another user's key
+        embed_model = _get_embed_model(config.EMBED_MODEL, openai_api_key)
+        index = VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
+        
+        # Embed only the delta; the same node list feeds BM25 below
+        new_nodes = parse_nodes(new_documents) if new_documents else []
+        if new_nodes:
+            # insert_nodes embeds one batch after another; the async batch API
+            # keeps EMBED_WORKERS requests in flight, and insert_nodes stores
+            # pre-embedded nodes as they are
+            embeddings = asyncio.run(embed_model.aget_text_embedding_batch(
+                [n.get_content(metadata_mode=MetadataMode.EMBED) for n in new_nodes],
+                show_progress=True
+            ))
+            for node, embedding in zip(new_nodes, embeddings):
+                node.embedding = embedding
+            index.insert_nodes(new_nodes)
+            # The vectors now live in Qdrant; BM25 only needs the text
+            for node in new_nodes:
+                node.embedding = None
+        
+        logger.log(LogLevel.INFO, "Index delta applied",
+                   new_docs=len(new_documents),
+                   deleted_docs=len(stale_ids),
+                   unchanged_docs=len(documents) - len(new_documents))
+        
+        # BM25 is rebuilt lazily on the next query from the patched node list
+        if new_documents or stale_ids:
+            clear_result_caches(source_files)
+            get_bm25_index().apply_delta(new_nodes, stale_ids)
         logger.log(LogLevel.INFO, "Vector index built successfully")
         return index
     
     except Exception as e:
         logger.log(LogLevel.ERROR, "Index creation failed", error=str(e))
+        invalidate_query_caches()  # a partial delta may have been applied
         st.error(f"❌ Indexierungsfehler: {str(e)}")
         return None
 
 
+def restore_persisted_index(openai_api_key: str) -> bool:
+    """
+    Reattach to the persistent collection on session start.
+    
+    Vectors stay in Qdrant and only the per-file page numbers are read
+    back (once per process, shared by later sessions), so a restart needs
+    neither re-parsing nor re-embedding; the shared BM25 index builds
+    itself from the collection on first query.
+    
+    Returns:
+        True if a non-empty collection was restored
+    """
+    try:
+        client = get_qdrant_client()
+        collection_name = config.COLLECTION_NAME
+        page_counts = get_collection_page_counts()
+        if not page_counts:
+            return False
+        
+        configure_settings(openai_api_key)
+        vector_store = QdrantVectorStore(client=client, collection_name=collection_name)
+        
+        st.session_state.qdrant_client = client
+        st.session_state.index = VectorStoreIndex.from_vector_store(
+            vector_store,
+            embed_model=_get_embed_model(config.EMBED_MODEL, openai_api_key)
+        )
+        st.session_state.uploaded_files = page_counts
+        st.session_state.is_ready = True
+        
+        logger.log(LogLevel.INFO, "Persisted index restored", files=len(page_counts))
+        return True
+    
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Index restore failed", error=str(e))
+        return False
+
+
+def drop_collection() -> None:
+    """Delete the persistent collection (admin reset)."""
+    try:
+        client = get_qdrant_client()
+        if client.collection_exists(config.COLLECTION_NAME):
+            client.delete_collection(config.COLLECTION_NAME)
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Collection deletion failed", error=str(e))
+    # Only after the delete: a concurrent query in between would otherwise
+    # re-cache answers from the collection that is about to disappear
+    invalidate_query_caches()
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # NEURAL HYBRID QUERY ENGINE (3-STAGE RETRIEVAL)
 # ══════════════════════════════════════════════════════════════════════════════
 
+if IMPORTS_AVAILABLE:
+    class ThreadedRetriever(BaseRetriever):
+        """
+        Async adapter for sync-only retrievers.
+        
+        Local on-disk Qdrant only allows a single sync client, and BM25's
+        default ``aretrieve`` just calls its sync scorer on the event loop.
+        Running both in worker threads lets fusion overlap them regardless
+        of retriever order.
+        """
+        
+        def __init__(self, retriever: 'BaseRetriever'):
+            super().__init__()
+            self._retriever = retriever
+        
+        def _retrieve(self, query_bundle):
+            return self._retriever.retrieve(query_bundle)
+        
+        async def _aretrieve(self, query_bundle):
+            return await asyncio.to_thread(self._retriever.retrieve, query_bundle)
+
+
+class SharedBM25Index:
+    """
+    Process-wide BM25 retriever built from the canonical Qdrant payloads.
+    
+    The collection is shared by all sessions, so one BM25 index serves
+    them all instead of each session holding its own copy of every node.
+    Building tokenizes every node, so it happens lazily on the first
+    query after a collection change, never per question. Removing a file
+    filters the loaded nodes in place and ingests append the freshly parsed
+    nodes, so neither re-reads the collection.
+    
+    The stemmer is created once and reused across rebuilds; the retriever
+    applies the same stemmer to corpus and queries, so index-time and
+    query-time tokens always match. (The retriever's ``tokenizer`` hook is
+    deprecated and ignored, so ``normalize_query`` cannot be plugged in.)
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Optional[List['BaseNode']] = None  # None = reload from Qdrant
+        self._retriever: Optional['BM25Retriever'] = None
+        self._stale = True
+        self._build_kwargs: Dict[str, Any] = {}
+        if Stemmer is not None:
+            self._build_kwargs["stemmer"] = Stemmer.Stemmer("english")
+    
+    def invalidate(self) -> None:
+        with self._lock:
+            self._nodes = None
+            self._retriever = None
+            self._stale = True
+    
+    def apply_delta(self, added: List['BaseNode'], removed_doc_ids: Set[str]) -> None:
+        """Patch the loaded nodes with an ingest delta (same node objects that were embedded)."""
+        with self._lock:
+            if self._nodes is not None:
+                self._nodes = [
+                    n for n in self._nodes if n.ref_doc_id not in removed_doc_ids
+                ] + list(added)
+            self._retriever = None
+            self._stale = True
+    
+    def drop_source_file(self, filename: str) -> None:
+        """Filter one file's nodes out in place; the rebuild skips the Qdrant scroll."""
+        with self._lock:
+            if self._nodes is not None:
+                self._nodes = [
+                    n for n in self._nodes if n.metadata.get("source_file") != filename
+                ]
+            self._retriever = None
+            self._stale = True
+    
+    def get(self) -> Optional['BM25Retriever']:
+        with self._lock:
+            if self._stale:
+                if self._nodes is None:
+                    client = get_qdrant_client()
+                    self._nodes = (
+                        load_persisted_nodes(client, config.COLLECTION_NAME)
+                        if client.collection_exists(config.COLLECTION_NAME) else []
+                    )
+                nodes = self._nodes
+                self._retriever = BM25Retriever.from_defaults(
+                    nodes=nodes,
+                    similarity_top_k=config.RETRIEVAL_TOP_K,
+                    **self._build_kwargs
+                ) if nodes else None
+                self._stale = False
+                logger.log(LogLevel.INFO, "BM25 retriever built", node_count=len(nodes))
+            return self._retriever
+
+
+@st.cache_resource
+def get_bm25_index() -> SharedBM25Index:
+    """Process-wide BM25 index holder."""
+    return SharedBM25Index()
+
+
+def get_bm25_retriever() -> Optional['BM25Retriever']:
+    """Return the shared BM25 retriever, building it if the collection changed."""
+    return get_bm25_index().get()
+
+
+def clear_result_caches(source_files: Optional[Set[str]] = None) -> None:
+    """
+    Drop cached answers and page counts derived from the collection.
+    
+    With ``source_files``, answers scoped to other documents survive; only
+    those scoped to the changed files and all-documents answers are dropped.
+    """
+    get_answer_cache().clear(source_files)
+    get_collection_page_counts.clear()
+    if config.ENABLE_SEMANTIC_CACHE:
+        try:
+            get_semantic_cache().clear(source_files)
+        except Exception as e:
+            logger.log(LogLevel.WARNING, "Semantic cache could not be cleared", error=str(e))
+
+
+def invalidate_query_caches() -> None:
+    """Drop all derived caches, including the shared BM25 index, after any collection change."""
+    clear_result_caches()
+    get_bm25_index().invalidate()
+
+
+@st.cache_resource(show_spinner=False)
+def get_reranker() -> Optional['SentenceTransformerRerank']:
+    """Process-wide cross-encoder, loaded once (None if disabled or unavailable)."""
+    if not (config.ENABLE_RERANKING and RERANKER_AVAILABLE):
+        return None
+    try:
+        reranker = SentenceTransformerRerank(model=config.RERANK_MODEL, top_n=config.RERANK_TOP_K)
+        logger.log(LogLevel.INFO, "Reranker loaded", model=config.RERANK_MODEL)
+        return reranker
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Reranker could not be loaded", error=str(e))
+        return None
+
+
+def get_retriever(
+    index: 'VectorStoreIndex',
+    source_file: Optional[str] = None,
+    lexical_only: bool = False
+) -> Optional['BaseRetriever']:
+    """
+    Return the (hybrid) retriever for a document scope, built once and reused.
+    
+    Retrievers are cached per scope in the session and dropped whenever
+    the index or the BM25 retriever is replaced, so questions skip
+    retriever and fusion setup. ``lexical_only`` returns plain BM25 (no
+    query embedding, no fusion), or None when BM25 is unavailable.
+    """
+    bm25_retriever = None
+    if BM25_AVAILABLE:
+        try:
+            bm25_retriever = get_bm25_retriever()
+        except Exception as e:
+            logger.log(LogLevel.WARNING, "BM25 unavailable, using vector-only", error=str(e))
+    
+    owner = (id(index), id(bm25_retriever))
+    if st.session_state.retriever_owner != owner:
+        st.session_state.retriever_cache = {}
+        st.session_state.retriever_owner = owner
+    
+    if lexical_only:
+        # Scope is enforced by the caller's post-filter, as for fused BM25 hits
+        return bm25_retriever
+    
+    cached = st.session_state.retriever_cache.get(source_file)
+    if cached is not None:
+        return cached
+    
+    # 2.1 Vector Retriever (Dense Embeddings)
+    vector_store_kwargs = {
+        "search_params": SearchParams(
+            hnsw_ef=config.HNSW_EF_SEARCH,
+            quantization=(
+                QuantizationSearchParams(
+                    rescore=True,
+                    oversampling=config.QUANTIZATION_OVERSAMPLING
+                )
+                if config.ENABLE_QUANTIZATION else None
+            )
+        )
+    }
+    if source_file:
+        # Filter pushdown into Qdrant's payload index
+        vector_store_kwargs["qdrant_filters"] = Filter(must=[
+            FieldCondition(key="source_file", match=MatchValue(value=source_file))
+        ])
+    vector_retriever = ThreadedRetriever(index.as_retriever(
+        similarity_top_k=config.RETRIEVAL_TOP_K,
+        vector_store_kwargs=vector_store_kwargs
+    ))
+    
+    # 2.2 Attempt Hybrid with BM25 if available
+    retriever = vector_retriever  # Default to vector-only
+    
+    if bm25_retriever is not None:
+        try:
+            # Cached BM25 retriever, scored off the event loop
+            retriever = QueryFusionRetriever(
+                retrievers=[vector_retriever, ThreadedRetriever(bm25_retriever)],
+                similarity_top_k=config.RETRIEVAL_TOP_K,
+                num_queries=config.FUSION_NUM_QUERIES,
+                mode="reciprocal_rerank",
+                use_async=True  # Dense + BM25 run concurrently
+            )
+            logger.log(LogLevel.INFO, "Using hybrid BM25 + Vector retrieval")
+        except Exception as e:
+            logger.log(LogLevel.WARNING, "BM25 fusion failed, using vector-only", 
+                       error=str(e))
+    else:
+        logger.log(LogLevel.INFO, "Using vector-only retrieval")
+    
+    st.session_state.retriever_cache[source_file] = retriever
+    return retriever
+
+
 def query_knowledge_base(
     index: 'VectorStoreIndex', 
-    question: str
-) -> Tuple[str, List[str]]:
+    question: str,
+    openai_key: str,
+    source_file: Optional[str] = None
+) -> Tuple[Iterator[str], List[str]]:
     """
     Neural Hybrid Retrieval with 3-Stage Pipeline:
     
     Stage 1: Query Expansion (Neural Semantic Router)
     Stage 2: Hybrid Retrieval (BM25 + Dense Embeddings via QueryFusion)
-    Stage 3: Context Assembly + LLM Generation
+    Stage 3: Context Assembly + streamed LLM Generation
+    
+    Retrieval completes before returning; the answer is streamed token by
+    token so the UI can render the first token immediately. Repeated
+    questions are served from the AnswerCache without retrieval or LLM calls.
     
     Args:
         index: VectorStoreIndex with embedded documents
         question: User query
+        openai_key: This session's OpenAI API key (billed for the query)
+        source_file: Restrict retrieval to this document (None = all)
     
     Returns:
-        Tuple of (answer, source_list)
+        Tuple of (answer_token_stream, source_list)
     """
+    start_ns = time.perf_counter_ns()
+    cache_key = AnswerCache.make_key(question, source_file)
+    cached = get_answer_cache().get(cache_key)
+    if cached is not None:
+        answer, sources = cached
+        logger.log(LogLevel.INFO, "Answer served from cache", sources_count=len(sources))
+        return iter([answer]), sources
+    
+    question_embedding = None
+    query_embedding = None
+    # Bare code lookups go to BM25 first; embedding them just for the cache
+    # would add the very call that route avoids
+    if config.ENABLE_SEMANTIC_CACHE and not NeuralSemanticRouter.is_identifier_lookup(question):
+        try:
+            # The cache is keyed on the question itself: expansion appends
+            # shared ontology terms that pull different questions of one
+            # domain together. The expanded query dense retrieval searches
+            # with is embedded in the same round trip and handed on, so a
+            # miss costs no extra serial embedding call.
+            embed_model = _get_embed_model(config.EMBED_MODEL, openai_key)
+            expanded, _, _ = NeuralSemanticRouter.expand_query(question)
+            
+            async def embed_question_and_query() -> List[List[float]]:
+                return await asyncio.gather(
+                    embed_model.aget_query_embedding(question),
+                    embed_model.aget_query_embedding(expanded)
+                )
+            
+            question_embedding, query_embedding = asyncio.run(embed_question_and_query())
+            cached = get_semantic_cache().get(question_embedding, cache_key)
+        except Exception as e:
+            logger.log(LogLevel.WARNING, "Semantic cache lookup failed", error=str(e))
+        if cached is not None:
+            answer, sources = cached
+            logger.log(LogLevel.INFO, "Answer served from semantic cache", sources_count=len(sources))
+            return iter([answer]), sources
+    
     try:
-        start_time = time.time()
-        logger.log(LogLevel.INFO, "Query received", question=question)
-        
-        # ═══ STAGE 1: NEURAL SEMANTIC EXPANSION ═══
-        expanded, domain, confidence = NeuralSemanticRouter.expand_query(question)
-        logger.log(LogLevel.INFO, "Query expanded", 
-                   domain=domain.value, confidence=f"{confidence:.2f}")
-        
-        # ═══ STAGE 2: HYBRID RETRIEVAL ═══
-        # 2.1 Vector Retriever (Dense Embeddings)
-        vector_retriever = index.as_retriever(similarity_top_k=12)
-        
-        # 2.2 Attempt Hybrid with BM25 if available
-        retriever = vector_retriever  # Default to vector-only
-        
-        if BM25_AVAILABLE and st.session_state.nodes_for_bm25:
+        messages, sources = asyncio.run(
+            aretrieve_context(index, question, source_file, query_embedding)
+        )
+    except Exception as e:
+        logger.log(LogLevel.ERROR, "Query failed", error=str(e))
+        return iter([f"⚠️ Fehler bei der Verarbeitung: {str(e)}"]), []
+    
+    llm = _get_llm(config.LLM_MODEL, config.TEMPERATURE, openai_key)
+    return stream_answer(messages, llm, start_ns, sources, cache_key, question_embedding), sources
+
+
+def stream_answer(
+    messages: List['ChatMessage'],
+    llm: 'OpenAI',
+    start_ns: int,
+    sources: List[str],
+    cache_key: Tuple,
+    question_embedding: Optional[List[float]] = None
+) -> Iterator[str]:
+    """
+    Stream LLM answer deltas for the assembled chat; cache the answer once complete.
+    
+    This is the only LLM call per question: the packed context is stuffed
+    into one prompt (the equivalent of LlamaIndex's ``compact`` mode), with
+    no per-chunk refine or tree-summarize passes and no LLM query rewriting.
+    Interrupted answers (the user reruns the app mid-stream) are not cached.
+    """
+    try:
+        # ``llm`` is the session's cached client, never the process-global
+        # Settings.llm another session may have repointed
+        deltas = []
+        first_token_ns = None
+        stream = llm.stream_chat(messages)
+        try:
+            for chunk in stream:
+                if chunk.delta:
+                    if first_token_ns is None:
+                        first_token_ns = time.perf_counter_ns()
+                    deltas.append(chunk.delta)
+                    yield chunk.delta
+        finally:
+            # A rerun mid-answer closes this generator; close the upstream
+            # response right away instead of waiting for garbage collection
+            stream.close()
+        
+        answer = "".join(deltas)
+        get_answer_cache().put(cache_key, answer, sources)
+        if question_embedding is not None:
             try:
-                # Create BM25 retriever from stored nodes
-                bm25_retriever = BM25Retriever.from_defaults(
-                    nodes=st.session_state.nodes_for_bm25,
-                    similarity_top_k=12
-                )
-                
-                # Create fusion retriever
-                retriever = QueryFusionRetriever(
-                    retrievers=[vector_retriever, bm25_retriever],
-                    similarity_top_k=config.RETRIEVAL_TOP_K,
-                    num_queries=config.FUSION_NUM_QUERIES,
-                    mode="reciprocal_rerank",
-                    use_async=False  # Streamlit doesn't support async well
-                )
-                logger.log(LogLevel.INFO, "Using hybrid BM25 + Vector retrieval")
+                get_semantic_cache().put(question_embedding, cache_key, answer, sources)
             except Exception as e:
-                logger.log(LogLevel.WARNING, "BM25 fusion failed, using vector-only", 
-                           error=str(e))
-        else:
-            logger.log(LogLevel.INFO, "Using vector-only retrieval")
+                logger.log(LogLevel.WARNING, "Semantic cache write failed", error=str(e))
         
-        # ═══ STAGE 2.5: RETRIEVE WITH EXPANDED QUERY ═══
-        retrieved_nodes = retriever.retrieve(expanded)
-        
-        # ═══ STAGE 3: CONTEXT ASSEMBLY ═══
-        context_str = "\n\n".join([
-            f"[Quelle: {node.metadata.get('source_file', 'Unbekannt')} "
-            f"S. {node.metadata.get('page_number', '?')}]\n{node.get_content()}"
-            for node in retrieved_nodes
-        ])
-        
-        # Truncate context if needed (token budget management)
-        max_context_chars = config.MAX_CONTEXT_TOKENS * 4  # ~4 chars per token
-        if len(context_str) > max_context_chars:
-            context_str = context_str[:max_context_chars]
-            logger.log(LogLevel.WARNING, "Context truncated due to token budget")
-        
-        # ═══ STAGE 4: LLM GENERATION ═══
-        full_query = f"""
-{ENTERPRISE_SYSTEM_PROMPT}
+        # Performance metrics
+        # Time to first token is what streaming makes the user wait for
+        elapsed_ns = time.perf_counter_ns() - start_ns
+        ttft_ns = (first_token_ns or time.perf_counter_ns()) - start_ns
+        logger.log(LogLevel.INFO, "Query completed", 
+                   duration_sec=f"{elapsed_ns / 1e9:.2f}",
+                   ttft_sec=f"{ttft_ns / 1e9:.2f}",
+                   sources_count=len(sources))
+    
+    except Exception as e:
+        logger.log(LogLevel.ERROR, "Answer generation failed", error=str(e))
+        yield f"\n\n⚠️ Fehler bei der Verarbeitung: {str(e)}"
 
-WICHTIG: Die folgenden Textausschnitte wurden speziell für deine Frage ausgewählt.
-Sie enthalten mit hoher Wahrscheinlichkeit die Antwort oder semantisch verwandte Informationen.
-Analysiere sie GENAU und nutze alle relevanten Begriffe!
 
-KONTEXT AUS DOKUMENTEN:
-{context_str}
+async def aretrieve_context(
+    index: 'VectorStoreIndex', 
+    question: str,
+    source_file: Optional[str] = None,
+    query_embedding: Optional[List[float]] = None
+) -> Tuple[List['ChatMessage'], List[str]]:
+    """
+    Stages 1-3: expand the query, retrieve hybrid, assemble the LLM chat.
+    
+    ``query_embedding`` is the already computed embedding of the expanded
+    query, if any; dense retrieval then reuses it instead of embedding again.
+    
+    Returns:
+        Tuple of (chat_messages, source_list)
+    """
+    logger.log(LogLevel.INFO, "Query received", question=question)
+    
+    # ═══ STAGE 1: NEURAL SEMANTIC EXPANSION ═══
+    expanded, domain, confidence = NeuralSemanticRouter.expand_query(question)
+    logger.log(LogLevel.INFO, "Query expanded", 
+               domain=domain.value, confidence=f"{confidence:.2f}")
+    
+    # ═══ STAGE 2: HYBRID RETRIEVAL ═══
+    # Bare code lookups try BM25 alone first (no embedding call, no fusion);
+    # without a BM25 index they go straight to the normal path below
+    retrieved_nodes = []
+    lexical = (
+        get_retriever(index, source_file, lexical_only=True)
+        if NeuralSemanticRouter.is_identifier_lookup(question) else None
+    )
+    if lexical is not None:
+        # bm25s pads with zero-score hits when no document contains the code
+        retrieved_nodes = [
+            n for n in await asyncio.to_thread(lexical.retrieve, expanded)
+            if (n.score or 0.0) > 0.0
+            and (not source_file or n.metadata.get("source_file") == source_file)
+        ]
+        logger.log(LogLevel.INFO, "Identifier lookup via BM25", hits=len(retrieved_nodes))
+    
+    # ═══ STAGE 2.5: RETRIEVE WITH EXPANDED QUERY ═══
+    if not retrieved_nodes:
+        retriever = get_retriever(index, source_file)
+        retrieved_nodes = await retriever.aretrieve(
+            QueryBundle(expanded, embedding=query_embedding)
+        )
+    if source_file:
+        # BM25 has no payload filter; drop its hits from other documents
+        retrieved_nodes = [
+            n for n in retrieved_nodes
+            if n.metadata.get("source_file") == source_file
+        ]
+    
+    # ═══ STAGE 2.6: PASSAGE DE-DUPLICATION ═══
+    # Dense and BM25 hits for the same passage carry different node IDs, and
+    # spec pages are often repeated verbatim across manuals. Keyed on the
+    # case/whitespace-normalized content prefix, duplicates are dropped
+    # before they take rerank slots or context tokens.
+    seen_passages = set()
+    unique_nodes = []
+    for node in retrieved_nodes:
+        passage_key = hash(" ".join(node.get_content()[:500].lower().split()))
+        if passage_key not in seen_passages:
+            seen_passages.add(passage_key)
+            unique_nodes.append(node)
+    retrieved_nodes = unique_nodes
+    
+    # ═══ STAGE 2.75: CROSS-ENCODER RERANK ═══
+    # Scores (question, passage) pairs jointly and keeps the best RERANK_TOP_K,
+    # so fewer, more relevant passages reach the context budget
+    reranker = get_reranker()
+    if reranker is not None and len(retrieved_nodes) > 1:
+        try:
+            retrieved_nodes = await asyncio.to_thread(
+                reranker.postprocess_nodes, retrieved_nodes, query_str=question
+            )
+        except Exception as e:
+            logger.log(LogLevel.WARNING, "Rerank failed, keeping fusion order", error=str(e))
+    
+    # ═══ STAGE 3: CONTEXT ASSEMBLY ═══
+    # Token budget management: whole passages are packed in rank order until
+    # the next one no longer fits, so no source is cut mid-text.
+    # Source (file, page) keys are collected in the same pass; the dict
+    # de-duplicates them in order and only the survivors are formatted.
+    context_parts = []
+    context_tokens = 0
+    context_budget = get_context_budget()
+    source_pages: Dict[Tuple[Any, Any], None] = {}
+    for node in retrieved_nodes:
+        source_key = (node.metadata.get('source_file', 'Unbekannt'), node.metadata.get('page_number', '?'))
+        header = node.metadata.get('source_header')
+        if header is None:
+            # Indexed before headers were stored at ingest
+            header = f"[Quelle: {source_key[0]} S. {source_key[1]}]"
+        part = f"{header}\n{node.get_content()}"
+        part_tokens = count_tokens(part) + 1  # + separator
+        if context_tokens + part_tokens > context_budget:
+            logger.log(LogLevel.WARNING, "Context truncated due to token budget",
+                       packed=len(context_parts), retrieved=len(retrieved_nodes))
+            break
+        context_parts.append(part)
+        context_tokens += part_tokens
+        source_pages[source_key] = None
+    context_str = "\n\n".join(context_parts)
+    
+    # ═══ PROMPT ASSEMBLY (generation is streamed by the caller) ═══
+    user_message = f"""{_CONTEXT_HEADER}{context_str}
 
 USER FRAGE: {question}
 
 ANTWORT (nutze den Kontext):"""
-        
-        llm = OpenAI(
-            model=config.LLM_MODEL,
-            temperature=config.TEMPERATURE
-        )
-        response_text = llm.complete(full_query).text
-        
-        # ═══ SOURCE EXTRACTION ═══
-        sources = []
-        seen = set()
-        for node in retrieved_nodes:
-            filename = node.metadata.get("source_file", "Unbekannt")
-            page_num = node.metadata.get("page_number", "?")
-            source_str = f"{filename} (S. {page_num})"
-            if source_str not in seen:
-                sources.append(source_str)
-                seen.add(source_str)
-        
-        # Performance metrics
-        duration = time.time() - start_time
-        logger.log(LogLevel.INFO, "Query completed", 
-                   duration_sec=f"{duration:.2f}",
-                   sources_count=len(sources))
-        
-        return response_text, sources
+    # The system turn is passed explicitly: OpenAI(system_prompt=...) is only
+    # applied by the prompt-level predict/stream helpers, not by stream_chat
+    messages = [
+        ChatMessage(role=MessageRole.SYSTEM, content=_SYSTEM_MESSAGE),
+        ChatMessage(role=MessageRole.USER, content=user_message),
+    ]
     
-    except Exception as e:
-        logger.log(LogLevel.ERROR, "Query failed", error=str(e))
-        return f"⚠️ Fehler bei der Verarbeitung: {str(e)}", []
+    # ═══ SOURCE EXTRACTION ═══
+    sources = [f"{filename} (S. {page_num})" for filename, page_num in source_pages]
+    
+    return messages, sources
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # FILE PROCESSING PIPELINE
 # ══════════════════════════════════════════════════════════════════════════════
 
-def process_single_pdf(
+async def process_single_pdf(
     uploaded_file, 
+    llama_key: str,
+    pdf_hash: Optional[str] = None
+) -> Optional[List['Document']]:
+    """
+    Parse one uploaded PDF straight from memory.
+    
+    Args:
+        uploaded_file: Streamlit UploadedFile
+        llama_key: LlamaParse API key
+        pdf_hash: Precomputed content hash of the upload
+    
+    Returns:
+        Parsed documents, or None on failure
+    """
+    try:
+        # UploadedFile is already in memory; no disk round-trip
+        return await parse_pdf_with_llamaparse(
+            uploaded_file.getvalue(), uploaded_file.name, llama_key, pdf_hash
+        )
+    
+    except Exception as e:
+        logger.log(LogLevel.ERROR, "File processing error", error=str(e))
+        st.error(f"Fehler: {uploaded_file.name}")
+        return None
+
+
+def process_uploaded_pdfs(
+    uploaded_files: List[Any], 
     llama_key: str, 
     openai_key: str
-) -> bool:
+) -> int:
     """
-    Secure file upload and processing pipeline.
+    Parse all uploaded PDFs concurrently and add them to the session store.
     
     Args:
-        uploaded_file: Streamlit UploadedFile
+        uploaded_files: Streamlit UploadedFile objects
         llama_key: LlamaParse API key
         openai_key: OpenAI API key
     
     Returns:
-        True if successful, False otherwise
+        Number of successfully processed files
     """
-    tmp_path = None
-    try:
-        # Create secure temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_path = tmp_file.name
-        
-        # Execute parsing
-        with st.spinner(f"⚙️ Enterprise Parser analysiert: {uploaded_file.name}..."):
-            documents = parse_pdf_with_llamaparse(tmp_path, uploaded_file.name, llama_key)
-        
-        # Cleanup temp file
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+    # Identical content already in the collection or earlier in this batch
+    # (e.g. the same PDF under another name) is neither parsed nor embedded again
+    pdf_hashes = {f.name: pdf_content_hash(f.getvalue()) for f in uploaded_files}
+    to_parse = []
+    batch_names: Dict[str, str] = {}  # pdf_hash -> first upload in this batch
+    for uploaded_file in uploaded_files:
+        pdf_hash = pdf_hashes[uploaded_file.name]
+        existing = batch_names.get(pdf_hash)
+        if existing is None:
+            try:
+                existing = find_indexed_pdf(get_qdrant_client(), config.COLLECTION_NAME, pdf_hash)
+            except Exception as e:
+                logger.log(LogLevel.WARNING, "Duplicate check failed", error=str(e))
+        if existing:
+            st.info(f"ℹ️ {uploaded_file.name} ist bereits als {existing} indexiert.")
+            logger.log(LogLevel.INFO, "Skipped duplicate upload",
+                       file=uploaded_file.name, indexed_as=existing)
+        else:
+            batch_names[pdf_hash] = uploaded_file.name
+            to_parse.append(uploaded_file)
+    uploaded_files = to_parse
+    if not uploaded_files:
+        return 0
+    
+    async def parse_all() -> List[Optional[List['Document']]]:
+        # Created inside the loop that asyncio.run starts for this ingest
+        limit = asyncio.Semaphore(config.PDF_PARSE_CONCURRENCY)
+        
+        async def parse_bounded(uploaded_file) -> Optional[List['Document']]:
+            async with limit:
+                return await process_single_pdf(
+                    uploaded_file, llama_key, pdf_hashes[uploaded_file.name]
+                )
         
+        return await asyncio.gather(*[parse_bounded(f) for f in uploaded_files])
+    
+    with st.spinner(f"⚙️ Enterprise Parser analysiert {len(uploaded_files)} Dokument(e)..."):
+        results = asyncio.run(parse_all())
+    
+    processed = 0
+    for uploaded_file, documents in zip(uploaded_files, results):
         if documents is None:
-            return False
+            continue
         
-        # Update session store
-        st.session_state.all_documents.extend(documents)
-        st.session_state.uploaded_files[uploaded_file.name] = len(documents)
+        # Queue for indexing; listed in uploaded_files only once persisted
+        st.session_state.documents_by_file[uploaded_file.name] = documents
+        processed += 1
         
         # Log action
         msg = f"Uploaded {uploaded_file.name} ({len(documents)} pages)"
@@ -1111,54 +2639,128 @@ def process_single_pdf(
             f"{datetime.now().strftime('%H:%M:%S')} - {msg}"
         )
         logger.log(LogLevel.INFO, msg)
-        
-        return True
     
-    except Exception as e:
-        logger.log(LogLevel.ERROR, "File processing error", error=str(e))
-        st.error(f"Fehler: {uploaded_file.name}")
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-        return False
+    return processed
 
 
-def rebuild_index(openai_key: str) -> None:
-    """Rebuild vector index from all documents in memory."""
-    if not st.session_state.all_documents:
+def index_pending_documents(openai_key: str) -> None:
+    """
+    Index the parsed documents that are still pending.
+    
+    Files already in the collection are not passed again, so each ingest
+    only diffs and embeds the new uploads. Pending files are listed as
+    indexed and released once they are persisted in Qdrant; on failure
+    they stay queued and unlisted, so the upload widgets offer them again
+    for retry. The shared BM25 index is rebuilt as part of the ingest.
+    """
+    if not st.session_state.documents_by_file:
         st.warning("Keine Dokumente im Speicher.")
         return
     
+    documents = list(itertools.chain.from_iterable(
+        st.session_state.documents_by_file.values()
+    ))
     with st.spinner("🚀 Vektorisierung & BM25-Indexierung läuft..."):
-        index = create_or_update_index(st.session_state.all_documents, openai_key)
+        index = create_or_update_index(documents, openai_key)
         if index:
+            # Build BM25 here, behind the ingest spinner, not on the first question.
+            # The vectors are already persisted, so a failed build must not
+            # fail the ingest; queries fall back to vector-only retrieval.
+            if BM25_AVAILABLE:
+                try:
+                    get_bm25_retriever()
+                except Exception as e:
+                    logger.log(LogLevel.WARNING, "BM25 warm-up failed, using vector-only",
+                               error=str(e))
             st.session_state.index = index
             st.session_state.is_ready = True
+            for filename, file_documents in st.session_state.documents_by_file.items():
+                st.session_state.uploaded_files[filename] = len(file_documents)
+            st.session_state.documents_by_file = {}
             st.toast("Index erfolgreich aktualisiert!", icon="✅")
 
 
-def remove_document(filename: str, openai_key: str) -> None:
-    """Remove document and rebuild index."""
-    st.session_state.all_documents = [
-        doc for doc in st.session_state.all_documents
-        if doc.metadata.get("source_file") != filename
-    ]
+def remove_document(filename: str) -> None:
+    """
+    Remove one document from the index.
+    
+    Deletes only that file's vectors and BM25 nodes; the remaining pages
+    are neither re-parsed nor re-scanned, so cost scales with the removed
+    document rather than the corpus.
+    """
+    st.session_state.documents_by_file.pop(filename, None)
     
     if filename in st.session_state.uploaded_files:
         del st.session_state.uploaded_files[filename]
         st.toast(f"Dokument entfernt: {filename}", icon="🗑️")
     
-    if st.session_state.all_documents:
-        rebuild_index(openai_key)
+    try:
+        delete_source_file(get_qdrant_client(), config.COLLECTION_NAME, filename)
+    except Exception as e:
+        logger.log(LogLevel.WARNING, "Vector deletion failed", file=filename, error=str(e))
+        invalidate_query_caches()
+    else:
+        clear_result_caches({filename})
+        get_bm25_index().drop_source_file(filename)
+    
+    if st.session_state.uploaded_files:
+        logger.log(LogLevel.INFO, "Document removed", file=filename)
     else:
         st.session_state.index = None
         st.session_state.is_ready = False
-        st.session_state.nodes_for_bm25 = []
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SIDEBAR CONTROLLER
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Static branding block; a plain literal like _ENTERPRISE_CSS, so the
+# per-rerun script execution re-evaluates it for free
+_SIDEBAR_BRANDING = """
+<div style="text-align:center; padding:2rem 0; margin-bottom:1rem;
+    border-bottom:1px solid rgba(255,255,255,0.1);">
+    <div style="width:64px; height:64px;
+        background:linear-gradient(135deg, #FF8C00 0%, #E67E00 100%);
+        border-radius:16px; margin:0 auto 12px; display:flex;
+        align-items:center; justify-content:center; font-size:2rem;
+        box-shadow:0 0 20px rgba(255,140,0,0.3);">🔧</div>
+    <div style="font-size:1.5rem; font-weight:700; color:#ffffff !important;
+        letter-spacing:-0.5px;">HydraulikDoc</div>
+    <div style="color:#94a3b8; font-size:0.8rem; letter-spacing:2px;">
+        ENTERPRISE AI
+    </div>
+</div>
+"""
+
+
+_USER_BADGE_TEMPLATE = """
+<div style="background:rgba(255,255,255,0.05); border:1px solid rgba(255,255,255,0.1);
+    padding:1rem; border-radius:12px; margin-bottom:1.5rem;
+    display:flex; align-items:center; gap:1rem;">
+    <div style="width:40px; height:40px; background:#FF8C00;
+        border-radius:50%; display:flex; align-items:center;
+        justify-content:center; font-weight:700; color:white;">
+        {initial}
+    </div>
+    <div>
+        <div style="font-weight:600;">{name}</div>
+        <div style="font-size:0.75rem; color:#94a3b8; text-transform:uppercase;">
+            {role}
+        </div>
+    </div>
+</div>
+"""
+
+
+def _user_badge_html(name: str, role: str) -> str:
+    """Sidebar profile badge HTML (render_sidebar keeps it in the session)."""
+    return _USER_BADGE_TEMPLATE.format(
+        initial=html.escape(name[:1].upper()),
+        name=html.escape(name),
+        role=html.escape(role)
+    )
+
+
 def render_sidebar(llama_key: Optional[str], openai_key: Optional[str]) -> Tuple[str, str]:
     """
     Render enterprise control panel sidebar.
@@ -1168,45 +2770,21 @@ def render_sidebar(llama_key: Optional[str], openai_key: Optional[str]) -> Tuple
     """
     with st.sidebar:
         # Branding
-        st.markdown("""
-        <div style="text-align:center; padding:2rem 0; margin-bottom:1rem;
-            border-bottom:1px solid rgba(255,255,255,0.1);">
-            <div style="width:64px; height:64px;
-                background:linear-gradient(135deg, #FF8C00 0%, #E67E00 100%);
-                border-radius:16px; margin:0 auto 12px; display:flex;
-                align-items:center; justify-content:center; font-size:2rem;
-                box-shadow:0 0 20px rgba(255,140,0,0.3);">🔧</div>
-            <div style="font-size:1.5rem; font-weight:700; color:#ffffff !important;
-                letter-spacing:-0.5px;">HydraulikDoc</div>
-            <div style="color:#94a3b8; font-size:0.8rem; letter-spacing:2px;">
-                ENTERPRISE AI
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_SIDEBAR_BRANDING, unsafe_allow_html=True)
         
         # User profile
         user = st.session_state.user
         if user:
-            st.markdown(f"""
-            <div style="background:rgba(255,255,255,0.05); border:1px solid rgba(255,255,255,0.1);
-                padding:1rem; border-radius:12px; margin-bottom:1.5rem;
-                display:flex; align-items:center; gap:1rem;">
-                <div style="width:40px; height:40px; background:#FF8C00;
-                    border-radius:50%; display:flex; align-items:center;
-                    justify-content:center; font-weight:700; color:white;">
-                    {user.name[0].upper()}
-                </div>
-                <div>
-                    <div style="font-weight:600;">{user.name}</div>
-                    <div style="font-size:0.75rem; color:#94a3b8; text-transform:uppercase;">
-                        {user.role}
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            # Formatted once per login; reruns reuse the session's copy
+            if "_user_badge_html" not in st.session_state:
+                st.session_state["_user_badge_html"] = _user_badge_html(user.name, user.role)
+            st.markdown(st.session_state["_user_badge_html"], unsafe_allow_html=True)
             
             if st.button("🚪 Logout", use_container_width=True):
                 st.session_state.authenticated = False
+                st.session_state.pop("_user_badge_html", None)
+                AuthManager.get_users.clear()
+                get_api_keys.clear()
                 st.rerun()
         
         st.markdown("---")
@@ -1247,26 +2825,28 @@ def render_sidebar(llama_key: Optional[str], openai_key: Optional[str]) -> Tuple
                     st.markdown(f"📄 **{display_name}** ({pages} S.)")
                 with col2:
                     if st.button("🗑️", key=f"del_{filename}", help="Dokument entfernen"):
-                        remove_document(filename, openai_key)
+                        remove_document(filename)
                         st.rerun()
         else:
             st.info("Wissensdatenbank leer.")
         
-        uploaded_file = st.file_uploader(
-            "Neues Dokument", 
+        uploads = st.file_uploader(
+            "Neue Dokumente", 
             type=["pdf"],
+            accept_multiple_files=True,
             label_visibility="collapsed"
         )
         
-        if uploaded_file:
-            if uploaded_file.name in st.session_state.uploaded_files:
+        if uploads:
+            new_uploads = [f for f in uploads if f.name not in st.session_state.uploaded_files]
+            if not new_uploads:
                 st.warning("⚠️ Datei existiert bereits.")
             elif not llama_key or not openai_key:
                 st.error("🔑 API Keys erforderlich!")
             else:
                 if st.button("🚀 Ingest & Index", type="primary", use_container_width=True):
-                    if process_single_pdf(uploaded_file, llama_key, openai_key):
-                        rebuild_index(openai_key)
+                    if process_uploaded_pdfs(new_uploads, llama_key, openai_key):
+                        index_pending_documents(openai_key)
                         st.rerun()
         
         st.markdown("---")
@@ -1274,12 +2854,12 @@ def render_sidebar(llama_key: Optional[str], openai_key: Optional[str]) -> Tuple
         # Admin controls
         if user and user.role == 'admin':
             if st.button("⚠️ System Reset", use_container_width=True):
-                st.session_state.all_documents = []
+                drop_collection()
+                st.session_state.documents_by_file = {}
                 st.session_state.uploaded_files = {}
                 st.session_state.index = None
                 st.session_state.is_ready = False
-                st.session_state.messages = []
-                st.session_state.nodes_for_bm25 = []
+                st.session_state.messages.clear()
                 st.toast("System zurückgesetzt.", icon="🔄")
                 time.sleep(1)
                 st.rerun()
@@ -1319,8 +2899,21 @@ def render_header() -> None:
 # CHAT INTERFACE
 # ══════════════════════════════════════════════════════════════════════════════
 
-def render_chat_interface() -> None:
-    """Render technical query assistant chat."""
+def render_sources(sources: List[str]) -> None:
+    """Render verified sources with native components instead of raw HTML."""
+    with st.expander(f"📚 Verifizierte Quellen ({len(sources)})", expanded=False):
+        st.markdown("\n".join(f"- {src}" for src in sources))
+
+
+@st.fragment
+def render_chat_interface(openai_key: Optional[str]) -> None:
+    """
+    Render technical query assistant chat.
+    
+    Runs as a fragment: chat input and scope changes rerun only this
+    function, not the header, sidebar and other tabs. Ingest and removal
+    still call st.rerun() for a full-app refresh.
+    """
     st.markdown("### 💬 Technical Query Assistant")
     
     if not st.session_state.is_ready:
@@ -1342,6 +2935,15 @@ def render_chat_interface() -> None:
         """, unsafe_allow_html=True)
         return
     
+    if not openai_key:
+        st.error("🔑 OpenAI API Key erforderlich!")
+        return
+    
+    # Optional document scope
+    scope_options = ["Alle Dokumente", *st.session_state.uploaded_files.keys()]
+    scope = st.selectbox("🔎 Suchbereich", scope_options, key="query_scope")
+    source_file = None if scope == scope_options[0] else scope
+    
     # Display message history
     for message in st.session_state.messages:
         with st.chat_message(
@@ -1350,14 +2952,8 @@ def render_chat_interface() -> None:
         ):
             st.markdown(message["content"])
             
-            if "sources" in message and message["sources"]:
-                sources_html = "<br>".join([f"• {src}" for src in message["sources"]])
-                st.markdown(f"""
-                <div class="source-box">
-                    <strong>📚 Verifizierte Quellen:</strong><br>
-                    {sources_html}
-                </div>
-                """, unsafe_allow_html=True)
+            if message.get("sources"):
+                render_sources(message["sources"])
     
     # Chat input
     if prompt := st.chat_input(
@@ -1369,26 +2965,21 @@ def render_chat_interface() -> None:
             st.markdown(prompt)
         
         with st.chat_message("assistant", avatar="🔧"):
-            message_placeholder = st.empty()
-            
             with st.spinner("🧠 Neural Semantic Router analysiert..."):
-                start_time = time.time()
-                response, sources = query_knowledge_base(st.session_state.index, prompt)
-                duration = time.time() - start_time
+                start_ns = time.perf_counter_ns()
+                token_stream, sources = query_knowledge_base(
+                    st.session_state.index, prompt, openai_key, source_file
+                )
             
-            message_placeholder.markdown(response)
+            # First tokens render while the LLM is still generating
+            response = st.write_stream(token_stream)
+            elapsed_ns = time.perf_counter_ns() - start_ns
             
             if sources:
-                sources_html = "<br>".join([f"• {src}" for src in sources])
-                st.markdown(f"""
-                <div class="source-box">
-                    <strong>📚 Verifizierte Quellen:</strong><br>
-                    {sources_html}
-                </div>
-                """, unsafe_allow_html=True)
+                render_sources(sources)
             
             logger.log(LogLevel.INFO, "Query UI completed", 
-                       duration_sec=f"{duration:.2f}")
+                       duration_sec=f"{elapsed_ns / 1e9:.2f}")
         
         st.session_state.messages.append({
             "role": "assistant",
@@ -1442,7 +3033,7 @@ def render_settings_tab(llama_key, openai_key):
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Dokumente", len(st.session_state.uploaded_files))
     c2.metric("Seiten", sum(st.session_state.uploaded_files.values()) if st.session_state.uploaded_files else 0)
-    c3.metric("Nodes", len(st.session_state.nodes_for_bm25) if st.session_state.nodes_for_bm25 else 0)
+    c3.metric("Nodes", get_indexed_node_count())
     c4.metric("Status", "✅" if st.session_state.is_ready else "⏳")
     
     st.markdown("---")
@@ -1459,15 +3050,15 @@ def render_settings_tab(llama_key, openai_key):
         st.markdown("#### 🔐 Admin")
         c1, c2 = st.columns(2)
         if c1.button("🗑️ Chat löschen", use_container_width=True):
-            st.session_state.messages = []
+            st.session_state.messages.clear()
             st.rerun()
         if c2.button("⚠️ Reset", use_container_width=True):
-            st.session_state.all_documents = []
+            drop_collection()
+            st.session_state.documents_by_file = {}
             st.session_state.uploaded_files = {}
             st.session_state.index = None
             st.session_state.is_ready = False
-            st.session_state.messages = []
-            st.session_state.nodes_for_bm25 = []
+            st.session_state.messages.clear()
             st.rerun()
 
 
@@ -1475,15 +3066,16 @@ def render_documents_tab(llama_key, openai_key):
     """Render document management tab."""
     st.markdown("### 📚 Dokumenten-Management")
     
-    uploaded_file = st.file_uploader("PDF hochladen", type=["pdf"])
-    if uploaded_file:
-        if uploaded_file.name in st.session_state.uploaded_files:
+    uploads = st.file_uploader("PDFs hochladen", type=["pdf"], accept_multiple_files=True)
+    if uploads:
+        new_uploads = [f for f in uploads if f.name not in st.session_state.uploaded_files]
+        if not new_uploads:
             st.warning("⚠️ Existiert bereits!")
         elif not llama_key or not openai_key:
             st.error("🔑 API Keys fehlen!")
         elif st.button("🚀 Verarbeiten", type="primary"):
-            if process_single_pdf(uploaded_file, llama_key, openai_key):
-                rebuild_index(openai_key)
+            if process_uploaded_pdfs(new_uploads, llama_key, openai_key):
+                index_pending_documents(openai_key)
                 st.rerun()
     
     st.markdown("---")
@@ -1492,7 +3084,7 @@ def render_documents_tab(llama_key, openai_key):
             c1, c2 = st.columns([5, 1])
             c1.markdown(f"📄 **{fname}** ({pages} S.)")
             if c2.button("🗑️", key=f"rm_{fname}"):
-                remove_document(fname, openai_key)
+                remove_document(fname)
                 st.rerun()
     else:
         st.info("📂 Keine Dokumente geladen.")
@@ -1580,6 +3172,12 @@ def main():
     llama_key, openai_key = get_api_keys()
     final_llama, final_openai = render_sidebar(llama_key, openai_key)
     
+    # Reattach to the persistent vector store once per session
+    if final_openai and not st.session_state.index_restore_attempted:
+        st.session_state.index_restore_attempted = True
+        if st.session_state.index is None and restore_persisted_index(final_openai):
+            st.rerun()
+    
     if VIDEO_AVAILABLE:
         tab_docs, tab_query, tab_video, tab_fluid, tab_settings = st.tabs([
             "📚 Dokumente", "🔍 Abfrage", "🎬 Video-Diagnose", "💧 Fluid & Service Advisor", "⚙️ Einstellungen"
@@ -1594,17 +3192,20 @@ def main():
         render_documents_tab(final_llama, final_openai)
     
     with tab_query:
-        render_chat_interface()
+        render_chat_interface(final_openai)
     
     with tab_fluid:
         render_fluid_advisor_tab()
     
     if tab_video is not None:
         with tab_video:
-            if VIDEO_AVAILABLE:
-                render_video_analyzer_tab()
-            else:
+            try:
+                from streamlit_integration import render_video_analyzer_tab
+            except ImportError as e:
+                logger.log(LogLevel.WARNING, "Video features disabled", error=str(e))
                 render_video_analyzer_placeholder()
+            else:
+                render_video_analyzer_tab()
     
     with tab_settings:
         render_settings_tab(final_llama, final_openai)